@@ -1,17 +1,42 @@
 """Whitelist-based authentication middleware for Telegram bot."""
 
+import time
+
 from telegram import Update
 from telegram.ext import ContextTypes
 
 from . import config, state
 
+# Positive auth results: user_id -> (checked_at, users generation)
+_AUTH_TTL = 60.0
+_auth_cache: dict[int, tuple[float, int]] = {}
+
 
 async def auth_check(update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
-    """Return True if user is whitelisted. Silently ignore unauthorized users."""
+    """Return True if user is whitelisted. Silently ignore unauthorized users.
+
+    Successful checks are remembered for a minute, or until the whitelist
+    is changed through state.add_user/remove_user.
+    """
     if update.effective_user is None:
         return False
     user_id = update.effective_user.id
 
+    hit = _auth_cache.get(user_id)
+    if (hit and hit[1] == state.users_generation()
+            and time.monotonic() - hit[0] < _AUTH_TTL):
+        return True
+
+    allowed = _check_user(update, user_id)
+    if allowed:
+        _auth_cache[user_id] = (time.monotonic(), state.users_generation())
+    else:
+        _auth_cache.pop(user_id, None)
+    return allowed
+
+
+def _check_user(update: Update, user_id: int) -> bool:
+    """Uncached whitelist lookup (auto-registers the admin)."""
     # Admin is always authorized
     if user_id == config.ADMIN_TELEGRAM_ID:
         # Auto-register admin on first use
@@ -18,6 +18,7 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY", "")
 OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY", "")
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN", "")
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "small")  # local faster-whisper size
 
 # Deployment
 DEPLOY_SERVER = os.environ.get("DEPLOY_SERVER", "")        # e.g. "root@100.64.0.5"
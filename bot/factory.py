@@ -1,8 +1,11 @@
 """Factory engine management: project creation, tmux sessions, log monitoring."""
 
 import asyncio
+import codecs
+import functools
 import json
 import logging
+import os
 import re
 import shutil
 import subprocess
@@ -10,6 +13,28 @@ import time
 from pathlib import Path
 from typing import Awaitable, Callable
 
+try:
+    import psutil  # optional: /health system readings
+except ImportError:
+    psutil = None
+else:
+    psutil.cpu_percent(interval=None)  # prime the counter so later calls don't block
+
+try:
+    import orjson  # optional: faster decoding of marker payloads
+except ImportError:
+    orjson = None
+
+try:
+    import re2  # optional: linear-time regex engine for marker scanning
+except ImportError:
+    re2 = None
+
+try:
+    from watchfiles import awatch  # optional: inotify-driven log tailing
+except ImportError:
+    awatch = None
+
 from . import config, state
 
 log = logging.getLogger(__name__)
@@ -47,6 +72,7 @@ ENGINES = {
 }
 
 
+@functools.lru_cache(maxsize=512)
 def _tmux_session_name(project: str, engine: str) -> str:
     return f"{project}-{engine}"
 
@@ -59,8 +85,30 @@ def _log_file(project: str, engine: str) -> Path:
     return _project_dir(project, engine) / "artifacts" / "reports" / "factory-run.log"
 
 
+def read_log_tail(log_path: Path, max_chars: int = 3900, max_bytes: int = 8192) -> str:
+    """Return the last ``max_chars`` characters of a log file.
+
+    Only the final ``max_bytes`` are read, so the cost doesn't grow with the
+    log. Reading more bytes than characters leaves room for multi-byte text
+    and means a character split by the seek is dropped, not mangled.
+    """
+    with open(log_path, "rb") as fh:
+        end = fh.seek(0, os.SEEK_END)
+        fh.seek(max(0, end - max_bytes))
+        return fh.read().decode("utf-8", "replace")[-max_chars:]
+
+
 # --- Project setup ---
 
+_ARTIFACT_DIRS = ("requirements", "reports", "architecture", "code",
+                  "tests", "reviews", "docs", "release")
+
+_GIT_INIT_SCRIPT = (
+    "git init -q -b main && git add -A && "
+    "git commit -q --allow-empty -m 'Initial project setup'"
+)
+
+
 def setup_project(project_name: str, engine: str, requirements: str,
                   deploy_config: dict | None = None) -> Path:
     """Create project directory, copy template, write requirements. Returns project dir.
@@ -68,12 +116,12 @@ def setup_project(project_name: str, engine: str, requirements: str,
     deploy_config may contain: project_type, deploy, deploy_server, subdomain.
     """
     proj_dir = _project_dir(project_name, engine)
-    proj_dir.mkdir(parents=True, exist_ok=True)
 
-    # Create artifacts structure
-    for subdir in ("requirements", "reports", "architecture", "code",
-                   "tests", "reviews", "docs", "release"):
-        (proj_dir / "artifacts" / subdir).mkdir(parents=True, exist_ok=True)
+    # Create artifacts structure; only the first call needs to walk parents
+    artifacts = proj_dir / "artifacts"
+    artifacts.mkdir(parents=True, exist_ok=True)
+    for subdir in _ARTIFACT_DIRS:
+        (artifacts / subdir).mkdir(exist_ok=True)
 
     # Copy engine template
     eng = ENGINES[engine]
@@ -90,17 +138,9 @@ def setup_project(project_name: str, engine: str, requirements: str,
     if deploy_config:
         _write_deploy_config(proj_dir, deploy_config)
 
-    # Init git repo
+    # Init git repo (one shell instead of three separate git spawns)
     subprocess.run(
-        ["git", "init", "-b", "main"],
-        cwd=proj_dir, capture_output=True,
-    )
-    subprocess.run(
-        ["git", "add", "."],
-        cwd=proj_dir, capture_output=True,
-    )
-    subprocess.run(
-        ["git", "commit", "-m", "Initial project setup"],
+        ["sh", "-c", _GIT_INIT_SCRIPT],
         cwd=proj_dir, capture_output=True,
     )
 
@@ -256,12 +296,39 @@ def list_active_sessions() -> list[str]:
 
 # --- Log monitoring ---
 
-_MARKER_RE = re.compile(r"\[FACTORY:(\w+)(?::(.+?))?\]")
+_MARKER_PATTERN = r"\[FACTORY:(\w+)(?::(.+?))?\]"
+
+
+def _compile_marker_re():
+    # google-re2 (declared in requirements) when its wheel is available;
+    # the stdlib engine if it is missing or rejects the pattern
+    if re2 is not None:
+        try:
+            return re2.compile(_MARKER_PATTERN)
+        except Exception:
+            log.warning("re2 rejected the marker pattern; using re")
+    return re.compile(_MARKER_PATTERN)
+
+
+_MARKER_RE = _compile_marker_re()
+_json_loads = orjson.loads if orjson else json.loads
+
+
+def _json_payload(payload: str, fallback_key: str) -> dict:
+    """Decode a JSON object payload; plain text is wrapped as {fallback_key: payload}."""
+    if payload.lstrip().startswith("{"):
+        try:
+            return _json_loads(payload)
+        except json.JSONDecodeError:  # orjson's error subclasses this
+            pass
+    return {fallback_key: payload}
 
 
 def parse_markers(text: str) -> list[dict]:
     """Parse [FACTORY:...] markers from log text."""
     markers = []
+    if "[FACTORY:" not in text:
+        return markers
     for match in _MARKER_RE.finditer(text):
         marker_type = match.group(1)
         payload = match.group(2) or ""
@@ -277,11 +344,7 @@ def parse_markers(text: str) -> list[dict]:
                     "score": int(parts[2]) if len(parts) > 2 else None,
                 })
         elif marker_type == "CLARIFY":
-            try:
-                data = json.loads(payload)
-            except json.JSONDecodeError:
-                data = {"question": payload}
-            markers.append({"type": "clarify", "data": data})
+            markers.append({"type": "clarify", "data": _json_payload(payload, "question")})
         elif marker_type == "ERROR":
             markers.append({"type": "error", "message": payload})
         elif marker_type == "COST":
@@ -292,17 +355,24 @@ def parse_markers(text: str) -> list[dict]:
                 "provider": parts[1] if len(parts) > 1 else "unknown",
             })
         elif marker_type == "COMPLETE":
-            try:
-                data = json.loads(payload)
-            except json.JSONDecodeError:
-                data = {"summary": payload}
-            markers.append({"type": "complete", "data": data})
+            markers.append({"type": "complete", "data": _json_payload(payload, "summary")})
 
     return markers
 
 
+_POLL_INTERVAL = 3       # seconds between log reads without watchfiles
+_LIVENESS_INTERVAL = 10  # seconds between tmux has-session checks when watching
+
+
 class LogMonitor:
-    """Async monitor that tails a factory log file and fires callbacks on markers."""
+    """Async monitor that tails a factory log file and fires callbacks on markers.
+
+    With watchfiles installed the loop wakes on inotify events for the log
+    file (and on a liveness timeout); otherwise it polls every few seconds.
+    The log is read through one handle kept open for the monitor's lifetime
+    (reopened if the file is rotated or truncated); reads run in a worker
+    thread so a slow disk never stalls the event loop.
+    """
 
     def __init__(self, project_name: str, engine: str,
                  on_event: Callable[[dict], Awaitable]):
@@ -311,111 +381,234 @@ class LogMonitor:
         self.on_event = on_event
         self._task: asyncio.Task | None = None
         self._stop = False
+        self._stop_event = asyncio.Event()
         self._last_pos = 0
+        self._fh = None
+        self._decoder = None
+
+    # Strong refs to running loops; the bot only holds monitors weakly
+    _running: set[asyncio.Task] = set()
 
     def start(self):
         self._stop = False
+        self._stop_event.clear()
         self._last_pos = 0
         self._task = asyncio.create_task(self._monitor_loop())
+        LogMonitor._running.add(self._task)
+        self._task.add_done_callback(LogMonitor._running.discard)
 
     def stop(self):
         self._stop = True
+        self._stop_event.set()
         if self._task:
             self._task.cancel()
 
+    def _read_new(self, log_path: Path) -> str:
+        """Return text appended since the last read. Blocking; run in a thread."""
+        try:
+            st = os.stat(log_path)
+        except FileNotFoundError:
+            return ""
+        if self._fh is not None:
+            # Rotated (new inode) or truncated: start over on the new file
+            if os.fstat(self._fh.fileno()).st_ino != st.st_ino or st.st_size < self._last_pos:
+                self._close()
+                self._last_pos = 0
+        if self._fh is None:
+            self._fh = open(log_path, "rb")
+            self._fh.seek(self._last_pos)
+            self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        data = self._fh.read()
+        self._last_pos = self._fh.tell()
+        return self._decoder.decode(data)
+
+    def _close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    async def _wakeups(self, log_path: Path):
+        """Yield whenever the log may have grown or liveness is due for a check."""
+        if awatch is None or not log_path.parent.is_dir():
+            while True:
+                await asyncio.sleep(_POLL_INTERVAL)
+                yield
+        target = str(log_path)
+        async for _ in awatch(
+            log_path.parent,
+            watch_filter=lambda _change, path: path == target,
+            stop_event=self._stop_event,
+            rust_timeout=_LIVENESS_INTERVAL * 1000,
+            yield_on_timeout=True,
+        ):
+            yield
+
     async def _monitor_loop(self):
         log_path = _log_file(self.project_name, self.engine)
         session = _tmux_session_name(self.project_name, self.engine)
+        interval = _POLL_INTERVAL if awatch is None else _LIVENESS_INTERVAL
+        last_check = time.monotonic()
 
-        while not self._stop:
-            await asyncio.sleep(3)
+        try:
+            async for _ in self._wakeups(log_path):
+                if self._stop:
+                    break
 
-            # Check if tmux session is still alive
-            if not is_session_alive(session):
-                await self.on_event({
-                    "type": "session_died",
-                    "project": self.project_name,
-                    "engine": self.engine,
-                })
-                state.update_run(
-                    self.project_name, self.engine,
-                    status="failed", finished_at=time.time(),
-                )
-                break
-
-            # Read new log content
-            if not log_path.exists():
-                continue
-
-            try:
-                with open(log_path) as f:
-                    f.seek(self._last_pos)
-                    new_content = f.read()
-                    self._last_pos = f.tell()
-            except OSError:
-                continue
-
-            if not new_content:
-                continue
-
-            # Parse and emit markers
-            markers = parse_markers(new_content)
-            for marker in markers:
-                marker["project"] = self.project_name
-                marker["engine"] = self.engine
+                # Check if tmux session is still alive
+                now = time.monotonic()
+                if now - last_check >= interval:
+                    last_check = now
+                    if not await a_is_session_alive(session):
+                        await self.on_event({
+                            "type": "session_died",
+                            "project": self.project_name,
+                            "engine": self.engine,
+                        })
+                        state.update_run(
+                            self.project_name, self.engine,
+                            status="failed", finished_at=time.time(),
+                        )
+                        break
+
+                # Read new log content
                 try:
-                    await self.on_event(marker)
-                except Exception as e:
-                    log.error("Error in event handler: %s", e)
-
-                # If factory completed, stop monitoring
-                if marker["type"] == "complete":
-                    state.update_run(
-                        self.project_name, self.engine,
-                        status="completed", finished_at=time.time(),
-                    )
-                    self._stop = True
+                    new_content = await asyncio.to_thread(self._read_new, log_path)
+                except OSError:
+                    continue
+
+                if not new_content:
+                    continue
+
+                # Parse and emit markers
+                markers = parse_markers(new_content)
+                for marker in markers:
+                    marker["project"] = self.project_name
+                    marker["engine"] = self.engine
+                    try:
+                        await self.on_event(marker)
+                    except Exception as e:
+                        log.error("Error in event handler: %s", e)
+
+                    # If factory completed, stop monitoring
+                    if marker["type"] == "complete":
+                        state.update_run(
+                            self.project_name, self.engine,
+                            status="completed", finished_at=time.time(),
+                        )
+                        self._stop = True
+                        # Release the awatch watcher thread now, as stop() does
+                        self._stop_event.set()
+                        break
+                if self._stop:
                     break
+        finally:
+            self._close()
 
 
 # --- Engine health check ---
 
-def check_engine(engine: str) -> dict:
-    """Check if an engine is installed and get its version."""
+_ENGINE_CHECK_TTL = 60  # seconds; installed versions rarely change
+_engine_checks: dict[str, tuple[float, dict]] = {}
+
+
+async def a_check_engine(engine: str) -> dict:
+    """Check if an engine is installed and get its version (cached for a minute)."""
     eng = ENGINES.get(engine)
     if not eng:
         return {"installed": False, "error": f"Unknown engine: {engine}"}
 
-    result = subprocess.run(
-        eng["check"], shell=True, capture_output=True, text=True, timeout=10,
+    cached = _engine_checks.get(engine)
+    if cached and time.monotonic() - cached[0] < _ENGINE_CHECK_TTL:
+        return cached[1]
+
+    proc = await asyncio.create_subprocess_shell(
+        eng["check"], stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
     )
-    if result.returncode == 0:
-        version = result.stdout.strip().split("\n")[0]
-        return {"installed": True, "version": version}
-    return {"installed": False, "error": result.stderr.strip()[:200]}
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout=10)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return {"installed": False, "error": "version check timed out"}
+
+    if proc.returncode == 0:
+        version = out.decode(errors="replace").strip().split("\n")[0]
+        result = {"installed": True, "version": version}
+    else:
+        result = {"installed": False, "error": err.decode(errors="replace").strip()[:200]}
+    _engine_checks[engine] = (time.monotonic(), result)
+    return result
 
 
-def check_all_engines() -> dict:
-    """Check all engines. Returns dict of engine -> status."""
-    return {name: check_engine(name) for name in ENGINES}
+async def a_check_all_engines() -> dict:
+    """Check all engines concurrently. Returns dict of engine -> status."""
+    results = await asyncio.gather(*(a_check_engine(name) for name in ENGINES))
+    return dict(zip(ENGINES, results))
 
 
 # --- System health ---
 
+_HEALTH_TTL = 5  # seconds
+_health_cache: tuple[float, dict] | None = None
+
+
 def system_health() -> dict:
-    """Get basic system health info."""
-    try:
-        import psutil
-        return {
-            "cpu_percent": psutil.cpu_percent(interval=1),
-            "memory": {
-                "total_gb": round(psutil.virtual_memory().total / (1024**3), 1),
-                "used_percent": psutil.virtual_memory().percent,
-            },
-            "disk": {
-                "total_gb": round(psutil.disk_usage("/").total / (1024**3), 1),
-                "used_percent": psutil.disk_usage("/").percent,
-            },
-        }
-    except ImportError:
+    """Get basic system health info (cached for a few seconds)."""
+    global _health_cache
+    if psutil is None:
         return {"error": "psutil not installed"}
+
+    now = time.monotonic()
+    if _health_cache and now - _health_cache[0] < _HEALTH_TTL:
+        return _health_cache[1]
+
+    vm = psutil.virtual_memory()
+    du = psutil.disk_usage("/")
+    health = {
+        # Non-blocking: usage since the previous call (primed at import)
+        "cpu_percent": psutil.cpu_percent(interval=None),
+        "memory": {
+            "total_gb": round(vm.total / (1024**3), 1),
+            "used_percent": vm.percent,
+        },
+        "disk": {
+            "total_gb": round(du.total / (1024**3), 1),
+            "used_percent": du.percent,
+        },
+    }
+    _health_cache = (now, health)
+    return health
+
+
+# --- Async wrappers ---
+# The functions above block on subprocess/file I/O; handlers running on the
+# event loop should use these so one user's tmux/git call doesn't stall others.
+
+async def a_setup_project(project_name: str, engine: str, requirements: str,
+                          deploy_config: dict | None = None) -> Path:
+    return await asyncio.to_thread(setup_project, project_name, engine,
+                                   requirements, deploy_config)
+
+
+async def a_start_engine(project_name: str, engine: str) -> str:
+    return await asyncio.to_thread(start_engine, project_name, engine)
+
+
+async def a_stop_engine(project_name: str, engine: str) -> bool:
+    return await asyncio.to_thread(stop_engine, project_name, engine)
+
+
+async def a_is_session_alive(session: str) -> bool:
+    return await asyncio.to_thread(is_session_alive, session)
+
+
+async def a_get_session_output(session: str, lines: int = 50) -> str:
+    return await asyncio.to_thread(get_session_output, session, lines)
+
+
+async def a_list_active_sessions() -> list[str]:
+    return await asyncio.to_thread(list_active_sessions)
+
+
+async def a_system_health() -> dict:
+    return await asyncio.to_thread(system_health)
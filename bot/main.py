@@ -1,10 +1,14 @@
 """Factory Control Bot — main entry point with all Telegram handlers."""
 
 import asyncio
+import functools
 import logging
 import os
-import tempfile
-from pathlib import Path
+import re
+import time
+import weakref
+from collections import deque
+from typing import Any, Awaitable, Callable
 
 from telegram import (
     InlineKeyboardButton,
@@ -14,6 +18,7 @@ from telegram import (
 )
 from telegram.constants import ChatAction, ParseMode
 from telegram.ext import (
+    AIORateLimiter,
     Application,
     CallbackQueryHandler,
     CommandHandler,
@@ -40,7 +45,16 @@ log = logging.getLogger(__name__)
 ) = range(8)
 
 # Active log monitors: {(project, engine): LogMonitor}
-_monitors: dict[tuple[str, str], factory.LogMonitor] = {}
+# Held weakly, so a monitor drops out on its own once its loop has finished
+_monitors: weakref.WeakValueDictionary[tuple[str, str], factory.LogMonitor] = (
+    weakref.WeakValueDictionary()
+)
+
+# Plain text (non-command) messages
+_TEXT_INPUT = filters.TEXT & ~filters.COMMAND
+
+# Valid project names: lowercase, digits and hyphens, no leading/trailing hyphen
+_PROJECT_NAME_RE = re.compile(r"^[a-z][a-z0-9-]*[a-z0-9]$")
 
 # Persistent reply keyboard
 REPLY_KB = ReplyKeyboardMarkup(
@@ -55,16 +69,27 @@ async def _authorized(update: Update, context: ContextTypes.DEFAULT_TYPE) -> boo
     return await auth.auth_check(update, context)
 
 
+# Engine key -> display name
+_ENGINE_NAMES: dict[str, str] = {key: eng["name"] for key, eng in factory.ENGINES.items()}
+
+# Preformatted toggle labels and callback data per engine, and the fixed Confirm row
+_CHECKED = {key: "V " + name for key, name in _ENGINE_NAMES.items()}
+_UNCHECKED = {key: "  " + name for key, name in _ENGINE_NAMES.items()}
+_ENGINE_CALLBACKS = {key: f"eng:{key}" for key in _ENGINE_NAMES}
+_CONFIRM_ROW = [InlineKeyboardButton("Confirm", callback_data="eng:confirm")]
+
+
 def _engines_keyboard(selected: set[str]) -> InlineKeyboardMarkup:
     """Build engine multi-select inline keyboard."""
-    buttons = []
-    for key, eng in factory.ENGINES.items():
-        check = "V " if key in selected else "  "
-        buttons.append([InlineKeyboardButton(
-            f"{check}{eng['name']}", callback_data=f"eng:{key}"
-        )])
-    buttons.append([InlineKeyboardButton("Confirm", callback_data="eng:confirm")])
-    return InlineKeyboardMarkup(buttons)
+    rows = [
+        [InlineKeyboardButton(
+            _CHECKED[key] if key in selected else _UNCHECKED[key],
+            callback_data=_ENGINE_CALLBACKS[key],
+        )]
+        for key in _ENGINE_NAMES
+    ]
+    rows.append(_CONFIRM_ROW)
+    return InlineKeyboardMarkup(rows)
 
 
 # ─── /start and main menu ────────────────────────────────────────────────────
@@ -113,7 +138,7 @@ async def cmd_new(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await _authorized(update, context):
         return ConversationHandler.END
     context.user_data["selected_engines"] = set()
-    context.user_data["voice_segments"] = []
+    context.user_data["voice_segments"] = _new_segments()
     await update.message.reply_text(
         "Select engines for this project (tap to toggle, then Confirm):",
         reply_markup=_engines_keyboard(set()),
@@ -135,7 +160,7 @@ async def engine_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return ST_ENGINE_SELECT
         engines_text = ", ".join(
-            factory.ENGINES[e]["name"] for e in selected
+            _ENGINE_NAMES[e] for e in selected
         )
         await query.edit_message_text(
             f"Engines: {engines_text}\n\nNow enter a project name (lowercase, hyphens only):"
@@ -159,20 +184,18 @@ async def engine_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def name_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
     name = update.message.text.strip().lower()
     # Validate name
-    import re
-    if not re.match(r"^[a-z][a-z0-9-]*[a-z0-9]$", name) or len(name) < 3:
+    if len(name) < 3 or not _PROJECT_NAME_RE.match(name):
         await update.message.reply_text(
             "Invalid name. Use lowercase letters, numbers, hyphens. Min 3 chars. Try again:"
         )
         return ST_NAME_INPUT
 
-    projects = state.load_projects()
-    if name in projects:
+    if state.get_project(name) is not None:
         await update.message.reply_text("Project name already exists. Choose another:")
         return ST_NAME_INPUT
 
     context.user_data["project_name"] = name
-    context.user_data["voice_segments"] = []
+    context.user_data["voice_segments"] = _new_segments()
 
     # Ask project type
     await update.message.reply_text(
@@ -350,37 +373,67 @@ async def subdomain_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return await _go_to_requirements_msg(update, context)
 
 
-async def _text_fallback_engines(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Remind user to use buttons during engine selection."""
-    await update.message.reply_text(
-        "Please tap the engine buttons above to toggle them, then press Confirm."
-    )
-    return ST_ENGINE_SELECT
-
-
-async def _text_fallback_project_type(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Remind user to use buttons during project type selection."""
-    await update.message.reply_text(
+# Reminders for text typed during button-only wizard steps: state -> hint
+_BUTTON_HINTS = {
+    ST_ENGINE_SELECT: "Please tap the engine buttons above to toggle them, then press Confirm.",
+    ST_PROJECT_TYPE: (
         "Please tap one of the project type buttons above:\n"
         "Telegram Bot / Web Service / Standalone"
-    )
-    return ST_PROJECT_TYPE
+    ),
+    ST_DEPLOY_ASK: "Please tap one of the deployment buttons above.",
+    ST_CONFIRM: "Please tap Start Factory or Cancel above.",
+}
 
 
-async def _text_fallback_deploy(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Remind user to use buttons during deploy question."""
-    await update.message.reply_text(
-        "Please tap one of the deployment buttons above."
-    )
-    return ST_DEPLOY_ASK
+def _text_fallback(wizard_state: int):
+    """Build a handler that reminds the user to use the buttons of ``wizard_state``."""
+    hint = _BUTTON_HINTS[wizard_state]
 
+    async def remind(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        await update.message.reply_text(hint)
+        return wizard_state
+
+    return remind
 
-async def _text_fallback_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Remind user to use buttons for final confirmation."""
-    await update.message.reply_text(
-        "Please tap Start Factory or Cancel above."
-    )
-    return ST_CONFIRM
+
+# Requirements wizard keyboards (built once; markups are immutable)
+_REQ_KB_FULL = InlineKeyboardMarkup([[
+    InlineKeyboardButton("Done", callback_data="req:done"),
+    InlineKeyboardButton("Delete Last", callback_data="req:del_last"),
+    InlineKeyboardButton("Clear All", callback_data="req:clear"),
+]])
+_REQ_KB_NO_DELLAST = InlineKeyboardMarkup([[
+    InlineKeyboardButton("Done", callback_data="req:done"),
+    InlineKeyboardButton("Clear All", callback_data="req:clear"),
+]])
+_REQ_KB_DONE_ONLY = InlineKeyboardMarkup([[
+    InlineKeyboardButton("Done", callback_data="req:done"),
+]])
+_TRANS_KB = InlineKeyboardMarkup([[
+    InlineKeyboardButton("Approve", callback_data="trans:approve"),
+    InlineKeyboardButton("Re-translate", callback_data="trans:retry"),
+    InlineKeyboardButton("Edit", callback_data="trans:edit"),
+]])
+_CONFIRM_KB = InlineKeyboardMarkup([[
+    InlineKeyboardButton("Start Factory", callback_data="confirm:yes"),
+    InlineKeyboardButton("Cancel", callback_data="confirm:no"),
+]])
+
+
+# Cap on requirement segments kept per wizard run (oldest are dropped)
+_MAX_SEGMENTS = 256
+
+
+def _new_segments() -> deque:
+    return deque(maxlen=_MAX_SEGMENTS)
+
+
+def _segments(context: ContextTypes.DEFAULT_TYPE) -> deque:
+    """The wizard's requirement segments, created on first use."""
+    segments = context.user_data.get("voice_segments")
+    if segments is None:
+        segments = context.user_data["voice_segments"] = _new_segments()
+    return segments
 
 
 async def _go_to_requirements(query, context: ContextTypes.DEFAULT_TYPE):
@@ -390,10 +443,7 @@ async def _go_to_requirements(query, context: ContextTypes.DEFAULT_TYPE):
         "Now describe your requirements.\n"
         "Send voice messages (Hebrew/English) or text.\n"
         "Press Done when finished.",
-        reply_markup=InlineKeyboardMarkup([[
-            InlineKeyboardButton("Done", callback_data="req:done"),
-            InlineKeyboardButton("Clear All", callback_data="req:clear"),
-        ]]),
+        reply_markup=_REQ_KB_NO_DELLAST,
     )
     return ST_REQUIREMENTS_INPUT
 
@@ -405,10 +455,7 @@ async def _go_to_requirements_msg(update: Update, context: ContextTypes.DEFAULT_
         "Now describe your requirements.\n"
         "Send voice messages (Hebrew/English) or text.\n"
         "Press Done when finished.",
-        reply_markup=InlineKeyboardMarkup([[
-            InlineKeyboardButton("Done", callback_data="req:done"),
-            InlineKeyboardButton("Clear All", callback_data="req:clear"),
-        ]]),
+        reply_markup=_REQ_KB_NO_DELLAST,
     )
     return ST_REQUIREMENTS_INPUT
 
@@ -433,35 +480,27 @@ def _deployment_summary(context: ContextTypes.DEFAULT_TYPE) -> str:
 
 
 async def requirements_voice(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle voice message during requirements gathering."""
-    await update.message.chat.send_action(ChatAction.TYPING)
-
-    # Download voice file
-    voice_file = await update.message.voice.get_file()
-    with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp:
-        ogg_path = tmp.name
-    await voice_file.download_to_drive(ogg_path)
+    """Handle voice message during requirements gathering.
+
+    A placeholder reply goes out right away and is edited in place once the
+    transcript is ready, so the user gets feedback before STT finishes.
+    """
+    placeholder, voice_file = await asyncio.gather(
+        update.message.reply_text("Transcribing..."),
+        update.message.voice.get_file(),
+    )
 
-    # Convert and transcribe
-    try:
-        wav_path = voice.ogg_to_wav(ogg_path)
-        text = await voice.transcribe(wav_path)
-    finally:
-        Path(ogg_path).unlink(missing_ok=True)
-        Path(ogg_path.rsplit(".", 1)[0] + ".wav").unlink(missing_ok=True)
+    # Download voice note into memory and transcribe the .ogg directly
+    audio = bytes(await voice_file.download_as_bytearray())
+    text = await voice.transcribe(audio)
 
-    segments = context.user_data.get("voice_segments", [])
+    segments = _segments(context)
     segments.append(text)
-    context.user_data["voice_segments"] = segments
 
     segment_count = len(segments)
-    await update.message.reply_text(
+    await placeholder.edit_text(
         f"Segment {segment_count}: {text}",
-        reply_markup=InlineKeyboardMarkup([[
-            InlineKeyboardButton("Done", callback_data="req:done"),
-            InlineKeyboardButton("Delete Last", callback_data="req:del_last"),
-            InlineKeyboardButton("Clear All", callback_data="req:clear"),
-        ]]),
+        reply_markup=_REQ_KB_FULL,
     )
     return ST_REQUIREMENTS_INPUT
 
@@ -472,18 +511,13 @@ async def requirements_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not text:
         return ST_REQUIREMENTS_INPUT
 
-    segments = context.user_data.get("voice_segments", [])
+    segments = _segments(context)
     segments.append(text)
-    context.user_data["voice_segments"] = segments
 
     segment_count = len(segments)
     await update.message.reply_text(
         f"Segment {segment_count}: {text}",
-        reply_markup=InlineKeyboardMarkup([[
-            InlineKeyboardButton("Done", callback_data="req:done"),
-            InlineKeyboardButton("Delete Last", callback_data="req:del_last"),
-            InlineKeyboardButton("Clear All", callback_data="req:clear"),
-        ]]),
+        reply_markup=_REQ_KB_FULL,
     )
     return ST_REQUIREMENTS_INPUT
 
@@ -494,28 +528,22 @@ async def requirements_callback(update: Update, context: ContextTypes.DEFAULT_TY
     await query.answer()
     action = query.data.split(":", 1)[1]
 
-    segments = context.user_data.get("voice_segments", [])
+    segments = _segments(context)
 
     if action == "del_last":
         if segments:
             removed = segments.pop()
-            context.user_data["voice_segments"] = segments
             await query.edit_message_text(
                 f"Removed: {removed[:50]}...\n{len(segments)} segments remaining.\n\nContinue adding or press Done.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("Done", callback_data="req:done"),
-                    InlineKeyboardButton("Clear All", callback_data="req:clear"),
-                ]]),
+                reply_markup=_REQ_KB_NO_DELLAST,
             )
         return ST_REQUIREMENTS_INPUT
 
     if action == "clear":
-        context.user_data["voice_segments"] = []
+        segments.clear()
         await query.edit_message_text(
             "All segments cleared. Send voice or text to start over.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("Done", callback_data="req:done"),
-            ]]),
+            reply_markup=_REQ_KB_DONE_ONLY,
         )
         return ST_REQUIREMENTS_INPUT
 
@@ -523,9 +551,7 @@ async def requirements_callback(update: Update, context: ContextTypes.DEFAULT_TY
         if not segments:
             await query.edit_message_text(
                 "No input received. Send voice or text first.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("Done", callback_data="req:done"),
-                ]]),
+                reply_markup=_REQ_KB_DONE_ONLY,
             )
             return ST_REQUIREMENTS_INPUT
 
@@ -534,19 +560,17 @@ async def requirements_callback(update: Update, context: ContextTypes.DEFAULT_TY
 
         await query.edit_message_text("Translating to English...")
 
-        # Translate Hebrew → English
-        english_text = await voice.translate_to_english(full_hebrew)
+        # Translate Hebrew → English. Requirements bypass the semantic cache:
+        # near-identical phrasing can still differ in meaning (a framework
+        # name, a negation), and a wrong spec is worse than an API call
+        english_text = await voice.translate_to_english(full_hebrew, use_cache=False)
         context.user_data["requirements_text"] = english_text
 
         await query.edit_message_text(
             f"Hebrew input:\n{full_hebrew[:500]}\n\n"
             f"English translation:\n{english_text}\n\n"
             "Is the English translation correct?",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("Approve", callback_data="trans:approve"),
-                InlineKeyboardButton("Re-translate", callback_data="trans:retry"),
-                InlineKeyboardButton("Edit", callback_data="trans:edit"),
-            ]]),
+            reply_markup=_TRANS_KB,
         )
         return ST_TRANSLATION_REVIEW
 
@@ -563,7 +587,7 @@ async def translation_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         # English translation approved — proceed to confirmation
         english_text = context.user_data["requirements_text"]
         engines = ", ".join(
-            factory.ENGINES[e]["name"]
+            _ENGINE_NAMES[e]
             for e in context.user_data["selected_engines"]
         )
         name = context.user_data["project_name"]
@@ -574,10 +598,7 @@ async def translation_callback(update: Update, context: ContextTypes.DEFAULT_TYP
             f"Engines: {engines}\n\n"
             f"Requirements (English):\n{english_text}\n\n"
             "Confirm to start the factory?",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("Start Factory", callback_data="confirm:yes"),
-                InlineKeyboardButton("Cancel", callback_data="confirm:no"),
-            ]]),
+            reply_markup=_CONFIRM_KB,
         )
         return ST_CONFIRM
 
@@ -586,17 +607,13 @@ async def translation_callback(update: Update, context: ContextTypes.DEFAULT_TYP
         hebrew_text = context.user_data.get("hebrew_text", "")
         await query.edit_message_text("Re-translating...")
 
-        english_text = await voice.translate_to_english(hebrew_text)
+        english_text = await voice.translate_to_english(hebrew_text, use_cache=False)
         context.user_data["requirements_text"] = english_text
 
         await query.edit_message_text(
             f"New translation:\n{english_text}\n\n"
             "Is this correct?",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("Approve", callback_data="trans:approve"),
-                InlineKeyboardButton("Re-translate", callback_data="trans:retry"),
-                InlineKeyboardButton("Edit", callback_data="trans:edit"),
-            ]]),
+            reply_markup=_TRANS_KB,
         )
         return ST_TRANSLATION_REVIEW
 
@@ -619,7 +636,7 @@ async def translation_text_edit(update: Update, context: ContextTypes.DEFAULT_TY
     context.user_data["requirements_text"] = corrected
 
     engines = ", ".join(
-        factory.ENGINES[e]["name"]
+        _ENGINE_NAMES[e]
         for e in context.user_data["selected_engines"]
     )
     deploy_info = _deployment_summary(context)
@@ -629,10 +646,7 @@ async def translation_text_edit(update: Update, context: ContextTypes.DEFAULT_TY
         f"Engines: {engines}\n\n"
         f"Requirements (English):\n{corrected}\n\n"
         "Confirm to start the factory?",
-        reply_markup=InlineKeyboardMarkup([[
-            InlineKeyboardButton("Start Factory", callback_data="confirm:yes"),
-            InlineKeyboardButton("Cancel", callback_data="confirm:no"),
-        ]]),
+        reply_markup=_CONFIRM_KB,
     )
     return ST_CONFIRM
 
@@ -658,7 +672,9 @@ async def confirm_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
       return ConversationHandler.END
     user_id = update.effective_user.id
 
-    state.create_project(
+    # Disk write; keep it off the event loop
+    await asyncio.to_thread(
+        state.create_project,
         name=name,
         engines=list(engines),
         description=requirements[:200],
@@ -677,19 +693,12 @@ async def confirm_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "subdomain": context.user_data.get("subdomain", "") or "",
     }
 
-    started = []
-    for engine in engines:
-        factory.setup_project(name, engine, requirements, deploy_config=deploy_config)
-        session = factory.start_engine(name, engine)
-
-        # Start log monitor
-        monitor = factory.LogMonitor(
-            name, engine,
-            on_event=lambda evt, uid=user_id: _handle_factory_event(evt, uid, context.application),
-        )
-        monitor.start()
-        _monitors[(name, engine)] = monitor
-        started.append(f"{factory.ENGINES[engine]['name']} (session: {session})")
+    on_event = functools.partial(_handle_factory_event, user_id=user_id, app=context.application)
+    results = await asyncio.gather(*(
+        _launch_engine(name, engine, requirements, deploy_config, on_event)
+        for engine in engines
+    ), return_exceptions=True)
+    started = _launch_report(name, engines, results, show_session=True)
 
     await query.edit_message_text(
         f"Project '{name}' created and factory started!\n\n"
@@ -699,6 +708,44 @@ async def confirm_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return ConversationHandler.END
 
 
+async def _launch_engine(name: str, engine: str, requirements: str, deploy_config: dict,
+                         on_event: Callable[[dict], Awaitable], setup: bool = True) -> str:
+    """Set up (optionally) and start one engine, and attach its log monitor.
+
+    Returns the tmux session name. Engines are independent, so callers
+    launch them concurrently.
+    """
+    if setup:
+        await factory.a_setup_project(name, engine, requirements, deploy_config=deploy_config)
+    session = await factory.a_start_engine(name, engine)
+
+    # Start log monitor
+    monitor = factory.LogMonitor(name, engine, on_event=on_event)
+    monitor.start()
+    _monitors[(name, engine)] = monitor
+    return session
+
+
+def _launch_report(name: str, engines: list[str], results: list,
+                   show_session: bool = False) -> list[str]:
+    """One line per engine from gather(..., return_exceptions=True) results.
+
+    A failed engine is logged and reported on its own line; the others
+    are unaffected.
+    """
+    lines = []
+    for engine, result in zip(engines, results):
+        label = _ENGINE_NAMES.get(engine, engine)
+        if isinstance(result, BaseException):
+            log.error("Failed to start %s for %s: %s", engine, name, result)
+            lines.append(f"{label}: failed to start ({result})")
+        elif show_session:
+            lines.append(f"{label} (session: {result})")
+        else:
+            lines.append(label)
+    return lines
+
+
 async def cmd_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Cancelled.", reply_markup=REPLY_KB)
     return ConversationHandler.END
@@ -706,49 +753,111 @@ async def cmd_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ─── Factory event handler (called from LogMonitor) ──────────────────────────
 
+# Telegram's hard limit is 4096 characters; leave headroom
+_MESSAGE_LIMIT = 4000
+
+
+def _pack_messages(parts: list[str], sep: str = "\n\n", limit: int = _MESSAGE_LIMIT) -> list[str]:
+    """Greedily join ``parts`` into as few messages of at most ``limit`` chars as possible.
+
+    A single part longer than ``limit`` keeps its head (where the
+    "[project/Engine]" tag is) and is cut off with an ellipsis.
+    """
+    messages: list[str] = []
+    current = ""
+    for part in parts:
+        if len(part) > limit:
+            part = part[:limit - 1] + "…"
+        if current and len(current) + len(sep) + len(part) <= limit:
+            current += sep + part
+            continue
+        if current:
+            messages.append(current)
+        current = part
+    if current:
+        messages.append(current)
+    return messages
+
+
+class _Notifier:
+    """Coalesces factory notifications per chat.
+
+    Texts queued for a chat within ``window`` seconds of each other go out
+    as one message, so bursts of phase events across engines don't run
+    into Telegram's flood limits. Order per chat is preserved.
+    """
+
+    def __init__(self, window: float = 0.1):
+        self.window = window
+        self._pending: dict[int, list[str]] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+
+    def send(self, bot, chat_id: int, text: str) -> None:
+        self._pending.setdefault(chat_id, []).append(text)
+        if chat_id not in self._tasks:
+            self._tasks[chat_id] = asyncio.create_task(self._drain(bot, chat_id))
+
+    async def _drain(self, bot, chat_id: int) -> None:
+        try:
+            while self._pending.get(chat_id):
+                await asyncio.sleep(self.window)
+                for message in _pack_messages(self._pending.pop(chat_id)):
+                    try:
+                        await bot.send_message(chat_id=chat_id, text=message)
+                    except Exception as e:
+                        log.error("Failed to send notification to %s: %s", chat_id, e)
+        finally:
+            self._tasks.pop(chat_id, None)
+
+
+_notifier = _Notifier()
+
+
+def _fmt_phase(event: dict, tag: str) -> str | None:
+    if event["action"] == "start":
+        return f"{tag} Phase {event['phase']} started"
+    if event["action"] == "end":
+        return f"{tag} Phase {event['phase']} completed (score: {event['score']})"
+    return None
+
+
+def _fmt_complete(event: dict, tag: str) -> str:
+    data = event["data"]
+    return (
+        f"{tag} FACTORY COMPLETE!\n"
+        f"Duration: {data.get('duration_minutes', '?')} min\n"
+        f"Cost: ${data.get('total_cost', '?')}\n"
+        f"Tests: {data.get('test_results', {})}"
+    )
+
+
+def _fmt_clarify(event: dict, tag: str) -> str:
+    # TODO: add inline buttons for multiple choice answers
+    return f"{tag} Clarification needed:\n\n{event['data'].get('question', '?')}"
+
+
+# Event type -> formatter(event, "[project/Engine]") returning the text or None to skip
+_EVENT_FORMATTERS: dict[str, Callable[[dict, str], str | None]] = {
+    "phase": _fmt_phase,
+    "error": lambda event, tag: f"{tag} ERROR: {event['message']}",
+    "complete": _fmt_complete,
+    "cost": lambda event, tag: None,  # Don't spam cost updates
+    "session_died": lambda event, tag: (
+        f"{tag} Session died unexpectedly! Use /logs {event['project']} to check."
+    ),
+    "clarify": _fmt_clarify,
+}
+
+
 async def _handle_factory_event(event: dict, user_id: int, app):
     """Send Telegram notification for factory events."""
-    engine_name = factory.ENGINES.get(event.get("engine", ""), {}).get("name", event.get("engine", ""))
-    project = event.get("project", "?")
-
-    if event["type"] == "phase":
-        action = event["action"]
-        phase = event["phase"]
-        score = event.get("score")
-        if action == "start":
-            text = f"[{project}/{engine_name}] Phase {phase} started"
-        elif action == "end":
-            text = f"[{project}/{engine_name}] Phase {phase} completed (score: {score})"
-        else:
-            return
-    elif event["type"] == "error":
-        text = f"[{project}/{engine_name}] ERROR: {event['message']}"
-    elif event["type"] == "complete":
-        data = event.get("data", {})
-        text = (
-            f"[{project}/{engine_name}] FACTORY COMPLETE!\n"
-            f"Duration: {data.get('duration_minutes', '?')} min\n"
-            f"Cost: ${data.get('total_cost', '?')}\n"
-            f"Tests: {data.get('test_results', {})}"
-        )
-    elif event["type"] == "cost":
-        return  # Don't spam cost updates
-    elif event["type"] == "session_died":
-        text = f"[{project}/{engine_name}] Session died unexpectedly! Use /logs {project} to check."
-    elif event["type"] == "clarify":
-        data = event.get("data", {})
-        text = (
-            f"[{project}/{engine_name}] Clarification needed:\n\n"
-            f"{data.get('question', '?')}"
-        )
-        # TODO: add inline buttons for multiple choice answers
-    else:
+    fmt = _EVENT_FORMATTERS.get(event["type"])
+    if fmt is None:
         return
-
-    try:
-        await app.bot.send_message(chat_id=user_id, text=text)
-    except Exception as e:
-        log.error("Failed to send notification to %s: %s", user_id, e)
+    engine = event["engine"]
+    text = fmt(event, f"[{event['project']}/{_ENGINE_NAMES.get(engine, engine)}]")
+    if text:
+        _notifier.send(app.bot, user_id, text)
 
 
 # ─── /projects — List projects ───────────────────────────────────────────────
@@ -756,6 +865,7 @@ async def _handle_factory_event(event: dict, user_id: int, app):
 async def cmd_projects(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await _authorized(update, context):
         return
+    # A snapshot taken under the state lock: safe while writers run in threads
     projects = state.load_projects()
     if not projects:
         await update.message.reply_text("No projects yet. Use /new to create one.")
@@ -783,35 +893,28 @@ async def cmd_factory(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     name = args[0]
-    projects = state.load_projects()
-    if name not in projects:
+    proj = state.get_project(name)
+    if proj is None:
         await update.message.reply_text(f"Project '{name}' not found. Use /projects to list.")
         return
 
-    proj = projects[name]
     engines = proj.get("engines", ["claude"])
     user_id = update.effective_user.id
 
-    started = []
-    for engine in engines:
-        requirements = proj.get("requirements", proj.get("description", ""))
-        proj_dir = factory._project_dir(name, engine)
-        if not proj_dir.exists():
-            deploy_config = {
-                "project_type": proj.get("project_type", "standalone"),
-                "deploy": proj.get("deploy", False),
-                "deploy_server": proj.get("deploy_server", ""),
-                "subdomain": proj.get("subdomain", ""),
-            }
-            factory.setup_project(name, engine, requirements, deploy_config=deploy_config)
-        session = factory.start_engine(name, engine)
-        monitor = factory.LogMonitor(
-            name, engine,
-            on_event=lambda evt, uid=user_id: _handle_factory_event(evt, uid, context.application),
-        )
-        monitor.start()
-        _monitors[(name, engine)] = monitor
-        started.append(factory.ENGINES[engine]["name"])
+    requirements = proj.get("requirements", proj.get("description", ""))
+    deploy_config = {
+        "project_type": proj.get("project_type", "standalone"),
+        "deploy": proj.get("deploy", False),
+        "deploy_server": proj.get("deploy_server", ""),
+        "subdomain": proj.get("subdomain", ""),
+    }
+    on_event = functools.partial(_handle_factory_event, user_id=user_id, app=context.application)
+    results = await asyncio.gather(*(
+        _launch_engine(name, engine, requirements, deploy_config, on_event,
+                       setup=not factory._project_dir(name, engine).exists())
+        for engine in engines
+    ), return_exceptions=True)
+    started = _launch_report(name, engines, results)
 
     await update.message.reply_text(
         f"Factory started for '{name}':\n" + "\n".join(f"- {s}" for s in started)
@@ -820,13 +923,24 @@ async def cmd_factory(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ─── /status — Show run status ───────────────────────────────────────────────
 
+_STATUS_ENGINE_TMPL = "\n{name}: {state}"
+
+
+async def _engine_snapshot(name: str, engine: str, lines: int) -> tuple[bool, str]:
+    """Return (alive, recent pane output) for one engine's tmux session."""
+    session = factory._tmux_session_name(name, engine)
+    alive = await factory.a_is_session_alive(session)
+    output = await factory.a_get_session_output(session, lines) if alive else ""
+    return alive, output
+
+
 async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await _authorized(update, context):
         return
     args = context.args
     if not args:
         # Show all active runs
-        sessions = factory.list_active_sessions()
+        sessions = await factory.a_list_active_sessions()
         if not sessions:
             await update.message.reply_text("No active factory runs.")
             return
@@ -836,19 +950,19 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     name = args[0]
-    projects = state.load_projects()
-    if name not in projects:
+    proj = state.get_project(name)
+    if proj is None:
         await update.message.reply_text(f"Project '{name}' not found.")
         return
 
-    proj = projects[name]
     lines = [f"Project: {name}", f"Status: {proj.get('status', 'unknown')}"]
 
-    for engine in proj.get("engines", []):
-        session = factory._tmux_session_name(name, engine)
-        alive = factory.is_session_alive(session)
-        output = factory.get_session_output(session, 10) if alive else "(not running)"
-        lines.append(f"\n{factory.ENGINES[engine]['name']}: {'running' if alive else 'stopped'}")
+    engines = proj.get("engines", [])
+    snapshots = await asyncio.gather(*(_engine_snapshot(name, e, 10) for e in engines))
+    for engine, (alive, output) in zip(engines, snapshots):
+        lines.append(_STATUS_ENGINE_TMPL.format(
+            name=_ENGINE_NAMES[engine], state="running" if alive else "stopped",
+        ))
         if alive and output:
             lines.append(f"```\n{output[-500:]}\n```")
 
@@ -866,20 +980,20 @@ async def cmd_stop(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     name = args[0]
-    projects = state.load_projects()
-    if name not in projects:
+    proj = state.get_project(name)
+    if proj is None:
         await update.message.reply_text(f"Project '{name}' not found.")
         return
 
     stopped = []
-    for engine in projects[name].get("engines", []):
+    for engine in proj.get("engines", []):
         # Stop monitor
         key = (name, engine)
-        if key in _monitors:
-            _monitors[key].stop()
-            del _monitors[key]
-        factory.stop_engine(name, engine)
-        stopped.append(factory.ENGINES[engine]["name"])
+        monitor = _monitors.pop(key, None)
+        if monitor is not None:
+            monitor.stop()
+        await factory.a_stop_engine(name, engine)
+        stopped.append(_ENGINE_NAMES[engine])
 
     await update.message.reply_text(
         f"Stopped: {', '.join(stopped)}" if stopped else "Nothing to stop."
@@ -898,37 +1012,35 @@ async def cmd_logs(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     name = args[0]
     engine = args[1] if len(args) > 1 else None
-    projects = state.load_projects()
-    if name not in projects:
+    proj = state.get_project(name)
+    if proj is None:
         await update.message.reply_text(f"Project '{name}' not found.")
         return
 
-    engines = [engine] if engine else projects[name].get("engines", [])
-    for eng in engines:
-        session = factory._tmux_session_name(name, eng)
-        if factory.is_session_alive(session):
-            output = factory.get_session_output(session, 50)
-            if output:
-                # Truncate to Telegram message limit
-                if len(output) > 3900:
-                    output = output[-3900:]
-                await update.message.reply_text(
-                    f"[{factory.ENGINES[eng]['name']}]\n```\n{output}\n```"
-                )
-            else:
-                await update.message.reply_text(f"[{factory.ENGINES[eng]['name']}] No output yet.")
-        else:
-            # Try reading log file
-            log_path = factory._log_file(name, eng)
-            if log_path.exists():
-                content = log_path.read_text()[-3900:]
-                await update.message.reply_text(
-                    f"[{factory.ENGINES[eng]['name']}] (stopped)\n```\n{content}\n```"
-                )
-            else:
-                await update.message.reply_text(
-                    f"[{factory.ENGINES[eng]['name']}] No log file found."
-                )
+    engines = [engine] if engine else proj.get("engines", [])
+    # Collect every engine's log concurrently, then reply in engine order,
+    # packing sections into as few messages as the size limit allows
+    parts = await asyncio.gather(*(_engine_log_message(name, eng) for eng in engines))
+    for text in _pack_messages(parts):
+        await update.message.reply_text(text)
+
+
+async def _engine_log_message(name: str, eng: str) -> str:
+    """Live tmux output for a running engine, else the tail of its log file."""
+    label = _ENGINE_NAMES[eng]
+    alive, output = await _engine_snapshot(name, eng, 50)
+    if alive:
+        if not output:
+            return f"[{label}] No output yet."
+        # Truncate to Telegram message limit
+        return f"[{label}]\n```\n{output[-3900:]}\n```"
+
+    # Try reading log file
+    log_path = factory._log_file(name, eng)
+    if not log_path.exists():
+        return f"[{label}] No log file found."
+    content = await asyncio.to_thread(factory.read_log_tail, log_path, 3900)
+    return f"[{label}] (stopped)\n```\n{content}\n```"
 
 
 # ─── /settings ────────────────────────────────────────────────────────────────
@@ -957,28 +1069,32 @@ async def cmd_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+_SETTINGS_OPTIONS = {
+    # "local" needs faster-whisper; don't offer a provider that can't load
+    "stt_provider": ("auto", "groq", "openai") + (("local",) if voice.LOCAL_STT_AVAILABLE else ()),
+    "tts_provider": ("edge", "openai"),
+    "tts_voice": ("en-US-AriaNeural", "en-US-GuyNeural", "en-GB-SoniaNeural"),
+    "default_engines": ("claude", "gemini", "opencode", "aider"),
+}
+
+# One option picker per setting, built once
+_SETTINGS_KEYBOARDS = {
+    key: InlineKeyboardMarkup([
+        [InlineKeyboardButton(opt, callback_data=f"setval:{key}:{opt}")] for opt in opts
+    ])
+    for key, opts in _SETTINGS_OPTIONS.items()
+}
+
+
 async def settings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     key = query.data.split(":", 1)[1]
 
-    options = {
-        "stt_provider": ["auto", "groq", "openai"],
-        "tts_provider": ["edge", "openai"],
-        "tts_voice": ["en-US-AriaNeural", "en-US-GuyNeural", "en-GB-SoniaNeural"],
-        "default_engines": ["claude", "gemini", "opencode", "aider"],
-    }
-
-    if key not in options:
+    keyboard = _SETTINGS_KEYBOARDS.get(key)
+    if keyboard is None:
         return
-
-    buttons = [
-        [InlineKeyboardButton(opt, callback_data=f"setval:{key}:{opt}")]
-        for opt in options[key]
-    ]
-    await query.edit_message_text(
-        f"Choose {key}:", reply_markup=InlineKeyboardMarkup(buttons)
-    )
+    await query.edit_message_text(f"Choose {key}:", reply_markup=keyboard)
 
 
 async def settings_value_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -988,29 +1104,31 @@ async def settings_value_callback(update: Update, context: ContextTypes.DEFAULT_
     key, value = parts[1], parts[2]
 
     if key == "default_engines":
-        # Toggle in list
-        settings = state.load_settings()
-        engines = settings.get("default_engines", [])
-        if value in engines:
-            engines.remove(value)
-        else:
-            engines.append(value)
-        if not engines:
-            engines = ["claude"]
-        state.update_setting("default_engines", engines)
+        # Toggle in list; read-modify-write happens under the settings lock
+        engines = await asyncio.to_thread(state.toggle_default_engine, value)
         await query.edit_message_text(f"Default engines: {', '.join(engines)}")
     else:
-        state.update_setting(key, value)
+        await asyncio.to_thread(state.update_setting, key, value)
         await query.edit_message_text(f"{key} set to: {value}")
 
 
+# set:/setval: callbacks share one handler that routes on the prefix
+_SETTINGS_CALLBACKS = {"set": settings_callback, "setval": settings_value_callback}
+_SETTINGS_CB_RE = re.compile(r"^(set|setval):")
+
+
+async def settings_dispatch(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    prefix = update.callback_query.data.partition(":")[0]
+    return await _SETTINGS_CALLBACKS[prefix](update, context)
+
+
 # ─── /engines — Check engine status ──────────────────────────────────────────
 
 async def cmd_engines(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await _authorized(update, context):
         return
     await update.message.chat.send_action(ChatAction.TYPING)
-    statuses = factory.check_all_engines()
+    statuses = await factory.a_check_all_engines()
     lines = []
     for name, info in statuses.items():
         eng = factory.ENGINES[name]
@@ -1023,24 +1141,31 @@ async def cmd_engines(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ─── /health — System health ─────────────────────────────────────────────────
 
+_HEALTH_TMPL = (
+    "System Health\n\n"
+    "CPU: {cpu}%\n"
+    "RAM: {ram_pct}% of {ram_gb} GB\n"
+    "Disk: {disk_pct}% of {disk_gb} GB"
+)
+
+
 async def cmd_health(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not await _authorized(update, context):
         return
-    health = factory.system_health()
+    health = await factory.a_system_health()
     if "error" in health:
         await update.message.reply_text(f"Health check error: {health['error']}")
         return
 
-    text = (
-        f"System Health\n\n"
-        f"CPU: {health['cpu_percent']}%\n"
-        f"RAM: {health['memory']['used_percent']}% "
-        f"of {health['memory']['total_gb']} GB\n"
-        f"Disk: {health['disk']['used_percent']}% "
-        f"of {health['disk']['total_gb']} GB"
-    )
+    text = _HEALTH_TMPL.format_map({
+        "cpu": health["cpu_percent"],
+        "ram_pct": health["memory"]["used_percent"],
+        "ram_gb": health["memory"]["total_gb"],
+        "disk_pct": health["disk"]["used_percent"],
+        "disk_gb": health["disk"]["total_gb"],
+    })
 
-    sessions = factory.list_active_sessions()
+    sessions = await factory.a_list_active_sessions()
     if sessions:
         text += f"\n\nActive tmux sessions: {len(sessions)}"
         for s in sessions[:10]:
@@ -1084,7 +1209,12 @@ async def cmd_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("Invalid user ID.")
             return
         name = " ".join(args[2:])
-        state.add_user(uid, name, "user")
+        existing = state.load_users().get(str(uid), {})
+        if existing.get("name") == name and existing.get("role") == "user" \
+                and existing.get("active", True):
+            await update.message.reply_text(f"User {uid} ({name}) already added, no change.")
+            return
+        await asyncio.to_thread(state.add_user, uid, name, "user")
         await update.message.reply_text(f"Added user {uid} ({name}).")
 
     elif action == "remove" and len(args) >= 2:
@@ -1096,7 +1226,10 @@ async def cmd_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if uid == config.ADMIN_TELEGRAM_ID:
             await update.message.reply_text("Cannot remove admin.")
             return
-        if state.remove_user(uid):
+        if str(uid) not in state.load_users():
+            await update.message.reply_text(f"User {uid} not found.")
+            return
+        if await asyncio.to_thread(state.remove_user, uid):
             await update.message.reply_text(f"Removed user {uid}.")
         else:
             await update.message.reply_text(f"User {uid} not found.")
@@ -1107,42 +1240,53 @@ async def cmd_admin(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ─── Voice handler (outside conversation — for general voice chat) ───────────
 
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
 async def voice_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle voice messages outside of the project wizard.
     Transcribes Hebrew, translates to English, sends both back."""
     if not await _authorized(update, context):
         return
 
-    await update.message.chat.send_action(ChatAction.TYPING)
+    # Typing indicator and file lookup are independent round trips
+    _, voice_file = await asyncio.gather(
+        update.message.chat.send_action(ChatAction.TYPING),
+        update.message.voice.get_file(),
+    )
 
-    # Download and convert
-    voice_file = await update.message.voice.get_file()
-    with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp:
-        ogg_path = tmp.name
-    await voice_file.download_to_drive(ogg_path)
+    # Download into memory; the .ogg is uploaded to STT as-is
+    audio = bytes(await voice_file.download_as_bytearray())
+    hebrew_text = await voice.transcribe(audio)
 
+    # Show the transcript while the translation is in flight, then fill it in
+    translate_task = asyncio.create_task(voice.translate_to_english(hebrew_text))
     try:
-        wav_path = voice.ogg_to_wav(ogg_path)
-        hebrew_text = await voice.transcribe(wav_path)
-    finally:
-        Path(ogg_path).unlink(missing_ok=True)
-        Path(ogg_path.rsplit(".", 1)[0] + ".wav").unlink(missing_ok=True)
-
-    # Translate to English
-    english_text = await voice.translate_to_english(hebrew_text)
+        sent = await update.message.reply_text(
+            f"Hebrew: {hebrew_text}\n\nEnglish: translating..."
+        )
+    except Exception:
+        translate_task.cancel()
+        raise
+    english_text = await translate_task
 
-    # Send both Hebrew transcription and English translation
-    await update.message.reply_text(
-        f"Hebrew: {hebrew_text}\n\nEnglish: {english_text}"
-    )
+    # Start TTS right away so it overlaps with updating the text reply
+    tts_task = asyncio.create_task(voice.text_to_speech(english_text))
+    try:
+        await sent.edit_text(f"Hebrew: {hebrew_text}\n\nEnglish: {english_text}")
+    except Exception:
+        tts_task.cancel()
+        raise
 
     # Send English text as voice (TTS)
-    ogg_response = await voice.text_to_speech(english_text)
+    ogg_response = await tts_task
     if ogg_response:
-        try:
-            await update.message.reply_voice(voice=open(ogg_response, "rb"))
-        finally:
-            Path(ogg_response).unlink(missing_ok=True)
+        # The file belongs to voice's TTS cache, so it is not deleted here;
+        # read it off the event loop and upload the bytes
+        ogg = await asyncio.to_thread(_read_bytes, ogg_response)
+        await update.message.reply_voice(voice=ogg)
 
 
 # ─── Text handler for reply keyboard buttons ─────────────────────────────────
@@ -1151,19 +1295,10 @@ async def reply_keyboard_handler(update: Update, context: ContextTypes.DEFAULT_T
     """Handle persistent reply keyboard button presses."""
     if not await _authorized(update, context):
         return
-    text = update.message.text
-    if text == "New Project":
-        return await cmd_new(update, context)
-    elif text == "Projects":
-        return await cmd_projects(update, context)
-    elif text == "Settings":
-        return await cmd_settings(update, context)
-    elif text == "Health":
-        return await cmd_health(update, context)
-    elif text == "Engines":
-        return await cmd_engines(update, context)
-    elif text == "Auth":
-        return await cmd_auth(update, context)
+    # _REPLY_DISPATCH is defined with the app wiring, after cmd_auth exists
+    handler = _REPLY_DISPATCH.get(update.message.text)
+    if handler:
+        return await handler(update, context)
 
 
 
@@ -1182,8 +1317,61 @@ _ENGINE_LABELS = {
     "pi":       "🔵 pi",
 }
 
+# Seconds to wait for auth statuses before showing a "Loading..." placeholder
+_AUTH_LOADING_DELAY = 0.2
+
+# Single "Back" button used by error branches of the auth panel
+_BACK_ONLY_KB = InlineKeyboardMarkup([[
+    InlineKeyboardButton("⬅️ Back", callback_data="auth:back"),
+]])
+
+
+class _ExpiringDict:
+    """Bounded dict whose entries expire ``ttl`` seconds after being set.
+
+    Expired entries are swept on write; once ``maxsize`` is reached the
+    oldest entry is evicted.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: dict = {}  # key -> (expires_at, value)
+
+    def __setitem__(self, key, value) -> None:
+        now = time.monotonic()
+        for k in [k for k, (exp, _) in self._data.items() if exp <= now]:
+            del self._data[k]
+        self._data.pop(key, None)
+        while len(self._data) >= self.maxsize:
+            del self._data[next(iter(self._data))]
+        self._data[key] = (now + self.ttl, value)
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+        if item[0] <= time.monotonic():
+            del self._data[key]
+            return default
+        return item[1]
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, None)
+        if item is None or item[0] <= time.monotonic():
+            return default
+        return item[1]
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, self) is not self
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
 # Store active auth operations: user_id -> {"engine": str, "phase": str}
-_auth_state: dict[int, dict] = {}
+# Abandoned flows (user walks away mid-OAuth) expire after 10 minutes.
+_auth_state = _ExpiringDict(maxsize=1024, ttl=600)
 
 
 def _auth_keyboard(statuses: dict) -> InlineKeyboardMarkup:
@@ -1251,154 +1439,187 @@ async def cmd_auth(update: Update, context: ContextTypes.DEFAULT_TYPE):
     return AUTH_PANEL
 
 
-async def auth_panel_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle button presses on the auth panel."""
-    query = update.callback_query
-    await query.answer()
-    parts = query.data.split(":")  # ["auth", action, ...]
-    action = parts[1] if len(parts) > 1 else ""
-    uid = update.effective_user.id
+async def _auth_close(query, context: ContextTypes.DEFAULT_TYPE, parts: list[str], uid: int):
+    """Close the auth panel."""
+    await query.edit_message_text("Auth panel closed.")
+    return ConversationHandler.END
 
-    if action == "close":
-        await query.edit_message_text("Auth panel closed.")
-        return ConversationHandler.END
 
-    if action == "back" or action == "refresh":
-        await query.edit_message_text("Loading...", reply_markup=None)
-        statuses = await auth_engines.all_status()
-        lines = ["🔐 *Engine Auth Panel*\n"]
-        for eng, label in _ENGINE_LABELS.items():
-            ok, desc = statuses.get(eng, (False, "?"))
-            lines.append(f"{label}: {desc}")
-        await query.edit_message_text(
-            "\n".join(lines),
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=_auth_keyboard(statuses),
+async def _auth_refresh(query, context: ContextTypes.DEFAULT_TYPE, parts: list[str], uid: int):
+    """Redraw the auth panel with fresh statuses."""
+    # Only flash "Loading..." when the status fan-out is actually slow,
+    # otherwise go straight to the final panel with a single edit.
+    status_task = asyncio.ensure_future(auth_engines.all_status())
+    try:
+        statuses = await asyncio.wait_for(
+            asyncio.shield(status_task), timeout=_AUTH_LOADING_DELAY,
         )
-        return AUTH_PANEL
+    except asyncio.TimeoutError:
+        await query.edit_message_text("Loading...", reply_markup=None)
+        statuses = await status_task
+    lines = ["🔐 *Engine Auth Panel*\n"]
+    for eng, label in _ENGINE_LABELS.items():
+        ok, desc = statuses.get(eng, (False, "?"))
+        lines.append(f"{label}: {desc}")
+    await query.edit_message_text(
+        "\n".join(lines),
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=_auth_keyboard(statuses),
+    )
+    return AUTH_PANEL
+
+
+async def _auth_select(query, context: ContextTypes.DEFAULT_TYPE, parts: list[str], uid: int):
+    """Show the action menu for one engine."""
+    eng = parts[2]
+    label = _ENGINE_LABELS.get(eng, eng)
+    ok, desc = await _get_engine_status(eng)
+    await query.edit_message_text(
+        f"*{label}*\n\nStatus: {desc}\n\nChoose action:",
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=_engine_action_keyboard(eng, ok),
+    )
+    context.user_data["auth_engine"] = eng
+    return AUTH_PANEL
+
 
-    if action == "select":
-        eng = parts[2]
-        label = _ENGINE_LABELS.get(eng, eng)
-        ok, desc = await _get_engine_status(eng)
+async def _auth_status(query, context: ContextTypes.DEFAULT_TYPE, parts: list[str], uid: int):
+    """Re-check and show one engine's status."""
+    eng = parts[2]
+    label = _ENGINE_LABELS.get(eng, eng)
+    ok, desc = await _get_engine_status(eng)
+    await query.edit_message_text(
+        f"*{label}*\n\nStatus: {desc}",
+        parse_mode=ParseMode.MARKDOWN,
+        reply_markup=_engine_action_keyboard(eng, ok),
+    )
+    return AUTH_PANEL
+
+
+async def _auth_oauth(query, context: ContextTypes.DEFAULT_TYPE, parts: list[str], uid: int):
+    """Start an OAuth flow for an engine with the chosen provider."""
+    eng = parts[2]
+    provider = (parts[3] if len(parts) > 3
+                else ("anthropic" if eng == "claude"
+                      else "google" if eng == "gemini"
+                      else "anthropic"))
+    label = _ENGINE_LABELS.get(eng, eng)
+
+    _PMETA = {
+        "anthropic": {
+            "label": "Anthropic  (claude.ai)",  "icon": "🟠",
+            "step2": "21️⃣ Log in at *claude.ai* → browser redirects to console.anthropic.com",
+            "code_label": "full redirect URL  (or just code#state from URL bar)",
+            "hint_re": None,
+        },
+        "google": {
+            "label": "Google / Gemini",  "icon": "🔵",
+            "step2": "22️⃣ Sign in → browser tries localhost:8085 (will fail)",
+            "code_label": "full redirect URL from address bar (http://localhost:8085/...)",
+            "hint_re": None,
+        },
+        "openai": {
+            "label": "OpenAI",  "icon": "🟢",
+            "step2": "2️⃣ Create / copy an *API key* from that page",
+            "code_label": "API key  (starts with sk-...)",
+            "hint_re": None,
+        },
+    }
+    pm = _PMETA.get(provider, _PMETA["anthropic"])
+
+    await query.edit_message_text(
+        f"Starting {pm['icon']} {pm['label']} for {label}..."
+    )
+
+    if provider == "anthropic":
+        ok, result = await auth_engines.anthropic_start_oauth()
+    elif provider == "google":
+        ok, result = await auth_engines.gemini_start_oauth()
+    elif provider == "openai":
+        ok, result = await auth_engines.openai_start_oauth()
+    else:
         await query.edit_message_text(
-            f"*{label}*\n\nStatus: {desc}\n\nChoose action:",
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=_engine_action_keyboard(eng, ok),
+            f"Unknown provider: {provider}", reply_markup=_BACK_ONLY_KB,
         )
-        context.user_data["auth_engine"] = eng
         return AUTH_PANEL
 
-    if action == "status":
-        eng = parts[2]
-        label = _ENGINE_LABELS.get(eng, eng)
-        ok, desc = await _get_engine_status(eng)
+    if not ok:
         await query.edit_message_text(
-            f"*{label}*\n\nStatus: {desc}",
-            parse_mode=ParseMode.MARKDOWN,
-            reply_markup=_engine_action_keyboard(eng, ok),
+            f"❌ Could not start {pm['label']}:\n\n{result}",
+            reply_markup=_BACK_ONLY_KB,
         )
         return AUTH_PANEL
 
-    if action in ("oauth", "poauth"):
-        eng = parts[2]
-        provider = (parts[3] if len(parts) > 3
-                    else ("anthropic" if eng == "claude"
-                          else "google" if eng == "gemini"
-                          else "anthropic"))
-        label = _ENGINE_LABELS.get(eng, eng)
-
-        _PMETA = {
-            "anthropic": {
-                "label": "Anthropic  (claude.ai)",  "icon": "🟠",
-                "step2": "21️⃣ Log in at *claude.ai* → browser redirects to console.anthropic.com",
-                "code_label": "full redirect URL  (or just code#state from URL bar)",
-                "hint_re": None,
-            },
-            "google": {
-                "label": "Google / Gemini",  "icon": "🔵",
-                "step2": "22️⃣ Sign in → browser tries localhost:8085 (will fail)",
-                "code_label": "full redirect URL from address bar (http://localhost:8085/...)",
-                "hint_re": None,
-            },
-            "openai": {
-                "label": "OpenAI",  "icon": "🟢",
-                "step2": "2️⃣ Create / copy an *API key* from that page",
-                "code_label": "API key  (starts with sk-...)",
-                "hint_re": None,
-            },
-        }
-        pm = _PMETA.get(provider, _PMETA["anthropic"])
+    context.user_data["auth_engine"]   = eng
+    context.user_data["auth_provider"] = provider
+    _auth_state[uid] = {"engine": eng, "provider": provider, "phase": "oauth"}
 
-        await query.edit_message_text(
-            f"Starting {pm['icon']} {pm['label']} for {label}..."
-        )
-
-        if provider == "anthropic":
-            ok, result = await auth_engines.anthropic_start_oauth()
-        elif provider == "google":
-            ok, result = await auth_engines.gemini_start_oauth()
-        elif provider == "openai":
-            ok, result = await auth_engines.openai_start_oauth()
-        else:
-            await query.edit_message_text(f"Unknown provider: {provider}")
-            return AUTH_PANEL
+    import re as _re
+    hint = ""
+    if pm["hint_re"]:
+        _m = _re.search(pm["hint_re"], result)
+        hint = f"\n_(State: `{_m.group(1)[:12]}...`)_" if _m else ""
 
-        if not ok:
-            await query.edit_message_text(
-                f"❌ Could not start {pm['label']}:\n\n{result}",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("⬅️ Back", callback_data="auth:back"),
-                ]]),
-            )
-            return AUTH_PANEL
+    await query.edit_message_text(
+        f"*{pm['icon']} {pm['label']}  →  {label}*\n\n"
+        f"1️⃣ Open in your browser:\n`{result}`\n\n"
+        f"{pm['step2']}{hint}\n\n"
+        f"3️⃣ Paste the *{pm['code_label']}* here\n\n"
+        "/cancel\\_auth to abort.",
+        parse_mode=ParseMode.MARKDOWN,
+    )
+    return AUTH_OAUTH_CODE
 
-        context.user_data["auth_engine"]   = eng
-        context.user_data["auth_provider"] = provider
-        _auth_state[uid] = {"engine": eng, "provider": provider, "phase": "oauth"}
 
-        import re as _re
-        hint = ""
-        if pm["hint_re"]:
-            _m = _re.search(pm["hint_re"], result)
-            hint = f"\n_(State: `{_m.group(1)[:12]}...`)_" if _m else ""
+async def _auth_apikey(query, context: ContextTypes.DEFAULT_TYPE, parts: list[str], uid: int):
+    """Prompt for an API key for an engine."""
+    eng = parts[2]
+    label = _ENGINE_LABELS.get(eng, eng)
+    context.user_data["auth_engine"] = eng
+    _auth_state[uid] = {"engine": eng, "phase": "apikey"}
+
+    provider_hints = {
+        "claude": "ANTHROPIC_API_KEY (sk-ant-...)",
+        "gemini": "GOOGLE_API_KEY or GEMINI_API_KEY",
+        "opencode": "OPENROUTER_API_KEY or ANTHROPIC_API_KEY",
+        "aider": "GROQ_API_KEY (gsk_...) | OPENROUTER_API_KEY | ANTHROPIC_API_KEY",
+        "pi": "ANTHROPIC_API_KEY (sk-ant-...)",
+    }
+    await query.edit_message_text(
+        f"*{label} — Set API Key*\n\n"
+        f"Expected: `{provider_hints.get(eng, 'API key')}`\n\n"
+        f"Paste your API key now.\n"
+        f"_(For Aider: format as `groq:gsk_...` or `openrouter:sk-or-...` "
+        f"to pick provider)_\n\n"
+        f"Send /cancel\\_auth to abort.",
+        parse_mode=ParseMode.MARKDOWN,
+    )
+    return AUTH_API_KEY
+
+
+# Auth panel callback actions: "auth:<action>:..." -> handler
+_AUTH_ACTIONS = {
+    "close": _auth_close,
+    "back": _auth_refresh,
+    "refresh": _auth_refresh,
+    "select": _auth_select,
+    "status": _auth_status,
+    "oauth": _auth_oauth,
+    "poauth": _auth_oauth,
+    "apikey": _auth_apikey,
+}
 
-        await query.edit_message_text(
-            f"*{pm['icon']} {pm['label']}  →  {label}*\n\n"
-            f"1️⃣ Open in your browser:\n`{result}`\n\n"
-            f"{pm['step2']}{hint}\n\n"
-            f"3️⃣ Paste the *{pm['code_label']}* here\n\n"
-            "/cancel\\_auth to abort.",
-            parse_mode=ParseMode.MARKDOWN,
-        )
-        return AUTH_OAUTH_CODE
-
-
-    if action == "apikey":
-        eng = parts[2]
-        label = _ENGINE_LABELS.get(eng, eng)
-        context.user_data["auth_engine"] = eng
-        _auth_state[uid] = {"engine": eng, "phase": "apikey"}
-
-        provider_hints = {
-            "claude": "ANTHROPIC_API_KEY (sk-ant-...)",
-            "gemini": "GOOGLE_API_KEY or GEMINI_API_KEY",
-            "opencode": "OPENROUTER_API_KEY or ANTHROPIC_API_KEY",
-            "aider": "GROQ_API_KEY (gsk_...) | OPENROUTER_API_KEY | ANTHROPIC_API_KEY",
-            "pi": "ANTHROPIC_API_KEY (sk-ant-...)",
-        }
-        await query.edit_message_text(
-            f"*{label} — Set API Key*\n\n"
-            f"Expected: `{provider_hints.get(eng, 'API key')}`\n\n"
-            f"Paste your API key now.\n"
-            f"_(For Aider: format as `groq:gsk_...` or `openrouter:sk-or-...` "
-            f"to pick provider)_\n\n"
-            f"Send /cancel\\_auth to abort.",
-            parse_mode=ParseMode.MARKDOWN,
-        )
-        return AUTH_API_KEY
 
-    return AUTH_PANEL
+async def auth_panel_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle button presses on the auth panel."""
+    query = update.callback_query
+    await query.answer()
+    parts = query.data.split(":")  # ["auth", action, ...]
+    action = parts[1] if len(parts) > 1 else ""
+    handler = _AUTH_ACTIONS.get(action)
+    if handler is None:
+        return AUTH_PANEL
+    return await handler(query, context, parts, update.effective_user.id)
 
 
 async def _get_engine_status(eng: str) -> tuple[bool, str]:
@@ -1538,6 +1759,16 @@ async def auth_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # ─── Build and run ───────────────────────────────────────────────────────────
 
+# Persistent reply keyboard buttons → handlers
+_REPLY_DISPATCH: dict[str, Callable[..., Awaitable[Any]]] = {
+    "New Project": cmd_new,
+    "Projects": cmd_projects,
+    "Settings": cmd_settings,
+    "Health": cmd_health,
+    "Engines": cmd_engines,
+    "Auth": cmd_auth,
+}
+_REPLY_RE = re.compile("^(" + "|".join(map(re.escape, _REPLY_DISPATCH)) + ")$")
 
 
 async def _debug_all_updates(update: Update, context) -> None:
@@ -1568,9 +1799,34 @@ async def error_handler(update: object, context) -> None:
             pass
 
 
+async def _post_init(app: Application) -> None:
+    """Warm up state caches and voice providers before polling starts."""
+    state.load_users()
+    state.load_projects()
+    state.load_settings()
+    await voice.prewarm()
+
+
+async def _post_shutdown(app: Application) -> None:
+    """Release shared resources on shutdown."""
+    await voice.aclose()
+    state.flush()
+
+
 def build_app() -> Application:
     """Build the Telegram bot application with all handlers."""
-    app = Application.builder().token(config.TELEGRAM_BOT_TOKEN).build()
+    app = (
+        Application.builder()
+        .token(config.TELEGRAM_BOT_TOKEN)
+        .connection_pool_size(256)
+        .pool_timeout(10.0)
+        .get_updates_connection_pool_size(2)
+        # Stay just under Telegram's ~30 msg/s bot-wide limit
+        .rate_limiter(AIORateLimiter(overall_max_rate=28, overall_time_period=1))
+        .post_init(_post_init)
+        .post_shutdown(_post_shutdown)
+        .build()
+    )
 
     app.add_handler(MessageHandler(filters.ALL, _debug_all_updates), group=-1)
     app.add_handler(CallbackQueryHandler(_debug_all_updates), group=-1)
@@ -1580,35 +1836,35 @@ def build_app() -> Application:
         states={
             ST_ENGINE_SELECT: [
                 CallbackQueryHandler(engine_toggle, pattern=r"^eng:"),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, _text_fallback_engines),
+                MessageHandler(_TEXT_INPUT, _text_fallback(ST_ENGINE_SELECT)),
             ],
             ST_NAME_INPUT: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, name_input),
+                MessageHandler(_TEXT_INPUT, name_input),
             ],
             ST_PROJECT_TYPE: [
                 CallbackQueryHandler(project_type_callback, pattern=r"^ptype:"),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, _text_fallback_project_type),
+                MessageHandler(_TEXT_INPUT, _text_fallback(ST_PROJECT_TYPE)),
             ],
             ST_DEPLOY_ASK: [
                 CallbackQueryHandler(deploy_callback, pattern=r"^deploy:"),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, _text_fallback_deploy),
+                MessageHandler(_TEXT_INPUT, _text_fallback(ST_DEPLOY_ASK)),
             ],
             ST_SUBDOMAIN_INPUT: [
                 CallbackQueryHandler(subdomain_callback, pattern=r"^(subdomain:|adminpanel:)"),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, subdomain_text),
+                MessageHandler(_TEXT_INPUT, subdomain_text),
             ],
             ST_REQUIREMENTS_INPUT: [
                 MessageHandler(filters.VOICE, requirements_voice),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, requirements_text),
+                MessageHandler(_TEXT_INPUT, requirements_text),
                 CallbackQueryHandler(requirements_callback, pattern=r"^req:"),
             ],
             ST_TRANSLATION_REVIEW: [
                 CallbackQueryHandler(translation_callback, pattern=r"^trans:"),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, translation_text_edit),
+                MessageHandler(_TEXT_INPUT, translation_text_edit),
             ],
             ST_CONFIRM: [
                 CallbackQueryHandler(confirm_callback, pattern=r"^confirm:"),
-                MessageHandler(filters.TEXT & ~filters.COMMAND, _text_fallback_confirm),
+                MessageHandler(_TEXT_INPUT, _text_fallback(ST_CONFIRM)),
             ],
         },
         fallbacks=[CommandHandler("cancel", cmd_cancel)],
@@ -1622,12 +1878,14 @@ def build_app() -> Application:
     app.add_handler(CommandHandler("help", cmd_help))
     app.add_handler(CommandHandler("menu", cmd_start))
     app.add_handler(CommandHandler("projects", cmd_projects))
-    app.add_handler(CommandHandler("factory", cmd_factory))
-    app.add_handler(CommandHandler("status", cmd_status))
+    # Updates are processed one at a time (ConversationHandler requires it);
+    # handlers that do slow I/O outside a conversation run non-blocking
+    app.add_handler(CommandHandler("factory", cmd_factory, block=False))
+    app.add_handler(CommandHandler("status", cmd_status, block=False))
     app.add_handler(CommandHandler("stop", cmd_stop))
-    app.add_handler(CommandHandler("logs", cmd_logs))
+    app.add_handler(CommandHandler("logs", cmd_logs, block=False))
     app.add_handler(CommandHandler("settings", cmd_settings))
-    app.add_handler(CommandHandler("engines", cmd_engines))
+    app.add_handler(CommandHandler("engines", cmd_engines, block=False))
 
     # Auth management conversation
     auth_conv = ConversationHandler(
@@ -1640,11 +1898,11 @@ def build_app() -> Application:
                 CallbackQueryHandler(auth_panel_callback, pattern=r"^auth:"),
             ],
             AUTH_OAUTH_CODE: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, auth_oauth_code_input),
+                MessageHandler(_TEXT_INPUT, auth_oauth_code_input),
                 CommandHandler("cancel_auth", auth_cancel),
             ],
             AUTH_API_KEY: [
-                MessageHandler(filters.TEXT & ~filters.COMMAND, auth_api_key_input),
+                MessageHandler(_TEXT_INPUT, auth_api_key_input),
                 CommandHandler("cancel_auth", auth_cancel),
             ],
         },
@@ -1657,20 +1915,19 @@ def build_app() -> Application:
     )
     app.add_handler(auth_conv)
     app.add_handler(CommandHandler("auth", cmd_auth))
-    app.add_handler(CommandHandler("health", cmd_health))
+    app.add_handler(CommandHandler("health", cmd_health, block=False))
     app.add_handler(CommandHandler("admin", cmd_admin))
     app.add_handler(CommandHandler("cancel", cmd_cancel))
 
     # Callback query handlers for settings
-    app.add_handler(CallbackQueryHandler(settings_callback, pattern=r"^set:"))
-    app.add_handler(CallbackQueryHandler(settings_value_callback, pattern=r"^setval:"))
+    app.add_handler(CallbackQueryHandler(settings_dispatch, pattern=_SETTINGS_CB_RE))
 
     # Voice handler (outside conversation)
-    app.add_handler(MessageHandler(filters.VOICE, voice_handler))
+    app.add_handler(MessageHandler(filters.VOICE, voice_handler, block=False))
 
     # Reply keyboard text handler
     app.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex(r"^(New Project|Projects|Settings|Health|Auth|Engines)$"),
+        filters.TEXT & filters.Regex(_REPLY_RE),
         reply_keyboard_handler,
     ))
 
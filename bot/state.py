@@ -1,10 +1,19 @@
 """JSON-based state management. No database required."""
 
+import atexit
+import copy
 import json
+import os
+import threading
 import time
 from pathlib import Path
 from typing import Any
 
+try:
+    import orjson  # optional: faster state file (de)serialisation
+except ImportError:
+    orjson = None
+
 from . import config
 
 _USERS_FILE = config.STATE_DIR / "users.json"
@@ -12,7 +21,7 @@ _PROJECTS_FILE = config.STATE_DIR / "projects.json"
 _SETTINGS_FILE = config.STATE_DIR / "settings.json"
 
 DEFAULT_SETTINGS = {
-    "stt_provider": "auto",       # "groq", "openai", "auto"
+    "stt_provider": "auto",       # "groq", "openai", "local", "auto"
     "tts_provider": "edge",       # "edge", "openai"
     "tts_voice": "en-US-AriaNeural",  # edge-tts voice name (English — all responses are in English)
     "default_engines": ["claude"],
@@ -22,53 +31,207 @@ DEFAULT_SETTINGS = {
 }
 
 
-def _load_json(path: Path, default: Any = None) -> Any:
-    if default is None:
-        default = {}
-    if not path.exists():
-        return default
-    return json.loads(path.read_text())
+def _dump_json(data: Any) -> bytes:
+    if orjson is not None:
+        # OPT_NON_STR_KEYS matches json.dumps, which coerces int keys to str
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _write_atomic(path: Path, raw: bytes) -> None:
+    """Write ``raw`` to a sibling temp file, fsync it and rename it over ``path``.
+
+    Readers see either the old or the new file, never a truncated one, and
+    the contents are on disk before the rename can be.
+    """
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _fsync_dir(path: Path) -> None:
+    """Make a rename in ``path`` durable."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _parse_json(raw: bytes) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+class _MtimeCache:
+    """Parsed contents of a JSON state file, reloaded only when the file changes.
+
+    The file is considered changed when its (st_mtime_ns, st_size) stamp
+    differs from the one recorded at the last load/store. With a non-zero
+    ``write_delay``, put() only marks the data dirty and a timer writes it
+    out once, coalescing bursts of updates into a single save.
+
+    ``lock`` only covers the in-memory data: a save serialises a snapshot
+    under it, then writes and fsyncs the file after releasing it, so
+    writers are never held up by disk I/O.
+    """
+
+    def __init__(self, path: Path, write_delay: float = 0.0):
+        self.path = path
+        self.data: Any = None
+        self.stamp: tuple[int, int] | None = None
+        self.write_delay = write_delay
+        self.lock = threading.RLock()
+        self._dirty = False
+        self._timer: threading.Timer | None = None
+        # Snapshots taken vs. written; the I/O lock keeps writes in order
+        self._seq = 0
+        self._written = 0
+        self._io_lock = threading.Lock()
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def get(self, default: Any = None) -> Any:
+        if self._dirty or self._written != self._seq:
+            return self.data
+        stamp = self._stat()
+        if stamp is None:
+            self.data, self.stamp = None, None
+            return {} if default is None else default
+        if stamp != self.stamp:
+            self.data = _parse_json(self.path.read_bytes())
+            self.stamp = stamp
+        return self.data
+
+    def put(self, data: Any) -> None:
+        """Keep ``data`` as the cached value and mark it for saving.
+
+        With ``write_delay`` a timer saves it; otherwise the caller must
+        call flush() (after releasing ``lock``, so no I/O happens under it).
+        """
+        with self.lock:
+            self.data = data
+            self._dirty = True
+            if self.write_delay and self._timer is None:
+                self._timer = threading.Timer(self.write_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        """Write pending data to disk, if any."""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            raw = _dump_json(self.data)
+            self._dirty = False
+            self._seq += 1
+            seq = self._seq
+        with self._io_lock:
+            if seq <= self._written:
+                return  # a newer snapshot has already been written
+            _write_atomic(self.path, raw)
+            _fsync_dir(self.path.parent)
+            self.stamp = self._stat()
+            self._written = seq
+
+
+_users_cache = _MtimeCache(_USERS_FILE)
+# Run status updates arrive in bursts (status -> phase -> finished)
+_projects_cache = _MtimeCache(_PROJECTS_FILE, write_delay=0.5)
+_settings_cache = _MtimeCache(_SETTINGS_FILE)
+
+# Serialise read-modify-write of each file; writers may run in worker threads
+_users_lock = _users_cache.lock
+_projects_lock = _projects_cache.lock
+_settings_lock = _settings_cache.lock
+
+
+def flush() -> None:
+    """Write out any state still waiting in a write-back cache."""
+    for cache in (_users_cache, _projects_cache, _settings_cache):
+        cache.flush()
+
+
+atexit.register(flush)
 
 
-def _save_json(path: Path, data: Any) -> None:
-    path.write_text(json.dumps(data, indent=2, ensure_ascii=False))
+# --- Users ---
 
+# Bumped on every whitelist change made through this module
+_users_generation = 0
+
+
+def users_generation() -> int:
+    """Counter that changes whenever add_user/remove_user modify the whitelist."""
+    return _users_generation
 
-# --- Users ---
 
 def load_users() -> dict:
-    return _load_json(_USERS_FILE)
+    """Private copy of the whitelist, safe to iterate while other threads write."""
+    with _users_lock:
+        return copy.deepcopy(_users_cache.get())
+
+
+def _bump_users_generation() -> None:
+    global _users_generation
+    _users_generation += 1
 
 
 def add_user(telegram_id: int, name: str, role: str = "user") -> None:
-    users = load_users()
-    users[str(telegram_id)] = {
+    user = {
         "name": name,
         "role": role,
         "active": True,
         "added_at": time.time(),
     }
-    _save_json(_USERS_FILE, users)
+    with _users_lock:
+        users = _users_cache.get()
+        users[str(telegram_id)] = user
+        _users_cache.put(users)
+        _bump_users_generation()
+    _users_cache.flush()
 
 
 def remove_user(telegram_id: int) -> bool:
-    users = load_users()
     key = str(telegram_id)
-    if key in users:
+    with _users_lock:
+        users = _users_cache.get()
+        if key not in users:
+            return False
         del users[key]
-        _save_json(_USERS_FILE, users)
-        return True
-    return False
+        _users_cache.put(users)
+        _bump_users_generation()
+    _users_cache.flush()
+    return True
 
 
 # --- Projects ---
 
+# load_projects/get_project return copies: the cached dict is mutated by
+# writers in worker threads, so callers must never hold on to it
+
 def load_projects() -> dict:
-    return _load_json(_PROJECTS_FILE)
+    with _projects_lock:
+        return copy.deepcopy(_projects_cache.get())
+
+
+def get_project(name: str) -> dict | None:
+    with _projects_lock:
+        return copy.deepcopy(_projects_cache.get().get(name))
 
 
 def save_projects(projects: dict) -> None:
-    _save_json(_PROJECTS_FILE, projects)
+    _projects_cache.put(projects)
 
 
 def create_project(name: str, engines: list[str], description: str,
@@ -77,7 +240,6 @@ def create_project(name: str, engines: list[str], description: str,
                    deploy: bool = False,
                    deploy_server: str = "",
                    subdomain: str = "") -> dict:
-    projects = load_projects()
     project = {
         "engines": engines,
         "description": description,
@@ -91,13 +253,14 @@ def create_project(name: str, engines: list[str], description: str,
         "created_at": time.time(),
         "runs": [],
     }
-    projects[name] = project
-    save_projects(projects)
-    return project
+    with _projects_lock:
+        projects = _projects_cache.get()
+        projects[name] = project
+        save_projects(projects)
+        return copy.deepcopy(project)
 
 
 def add_run(project_name: str, engine: str, tmux_session: str) -> dict:
-    projects = load_projects()
     run = {
         "engine": engine,
         "tmux_session": tmux_session,
@@ -106,37 +269,77 @@ def add_run(project_name: str, engine: str, tmux_session: str) -> dict:
         "started_at": time.time(),
         "finished_at": None,
     }
-    projects[project_name]["runs"].append(run)
-    projects[project_name]["status"] = "running"
-    save_projects(projects)
-    return run
+    with _projects_lock:
+        projects = _projects_cache.get()
+        projects[project_name]["runs"].append(run)
+        projects[project_name]["status"] = "running"
+        save_projects(projects)
+        return dict(run)
 
 
 def update_run(project_name: str, engine: str, **kwargs) -> None:
-    projects = load_projects()
-    for run in projects[project_name]["runs"]:
-        if run["engine"] == engine and run["status"] == "running":
-            run.update(kwargs)
-            break
-    save_projects(projects)
+    with _projects_lock:
+        projects = _projects_cache.get()
+        # The live run is at or near the end of the history
+        for run in reversed(projects[project_name]["runs"]):
+            if run["engine"] == engine and run["status"] == "running":
+                run.update(kwargs)
+                break
+        save_projects(projects)
 
 
 # --- Settings ---
 
-def load_settings() -> dict:
-    settings = _load_json(_SETTINGS_FILE, DEFAULT_SETTINGS.copy())
-    # Merge defaults for any missing keys
+# The cached settings dict that already has the defaults merged in
+_settings_merged: dict | None = None
+
+
+def _settings() -> dict:
+    """The live cached settings with defaults merged in. Hold _settings_lock."""
+    global _settings_merged
+    settings = _settings_cache.get()
+    if settings is _settings_merged:
+        return settings
+    # Merge defaults for any missing keys, once per (re)load of the file
     for k, v in DEFAULT_SETTINGS.items():
-        if k not in settings:
-            settings[k] = v
+        settings.setdefault(k, v)
+    _settings_merged = settings
     return settings
 
 
+def load_settings() -> dict:
+    with _settings_lock:
+        return copy.deepcopy(_settings())
+
+
+def get_setting(key: str) -> Any:
+    with _settings_lock:
+        return copy.deepcopy(_settings().get(key, DEFAULT_SETTINGS.get(key)))
+
+
 def save_settings(settings: dict) -> None:
-    _save_json(_SETTINGS_FILE, settings)
+    _settings_cache.put(settings)
+    _settings_cache.flush()
 
 
 def update_setting(key: str, value: Any) -> None:
-    settings = load_settings()
-    settings[key] = value
-    save_settings(settings)
+    with _settings_lock:
+        settings = _settings()
+        settings[key] = value
+        _settings_cache.put(settings)
+    _settings_cache.flush()
+
+
+def toggle_default_engine(engine: str) -> list[str]:
+    """Add or remove ``engine`` from default_engines atomically. Returns the new list."""
+    with _settings_lock:
+        settings = _settings()
+        engines = [e for e in settings.get("default_engines", []) if e != engine]
+        if len(engines) == len(settings.get("default_engines", [])):
+            engines.append(engine)
+        if not engines:
+            engines = ["claude"]
+        settings["default_engines"] = engines
+        _settings_cache.put(settings)
+    _settings_cache.flush()
+    return list(engines)
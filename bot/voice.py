@@ -1,100 +1,565 @@
 """Multi-provider STT (speech-to-text) and TTS (text-to-speech)."""
 
 import asyncio
+import hashlib
+import importlib.util
+import io
 import logging
-import subprocess
-import tempfile
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Awaitable, Callable
 
 import httpx
 import edge_tts
 
+try:
+    from faster_whisper import WhisperModel  # optional: offline STT fallback
+except ImportError:
+    WhisperModel = None
+
+# Whether stt_provider="local" can work in this install
+LOCAL_STT_AVAILABLE = WhisperModel is not None
+
+try:
+    import numpy as np  # optional: semantic translation cache
+    from fastembed import TextEmbedding
+except ImportError:
+    np = None
+    TextEmbedding = None
+
 from . import config, state
 
 log = logging.getLogger(__name__)
 
-# --- Audio conversion ---
+# Shared HTTP client: keeps TLS sessions to Groq/OpenAI alive across voice
+# messages. HTTP/2 is used when the optional ``h2`` package is installed.
+_client = httpx.AsyncClient(
+    http2=importlib.util.find_spec("h2") is not None,
+    timeout=httpx.Timeout(30.0, connect=5.0),
+    limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+)
+
 
-def ogg_to_wav(ogg_path: str) -> str:
-    """Convert Telegram .ogg voice to .wav for Whisper. Returns wav path."""
-    wav_path = ogg_path.rsplit(".", 1)[0] + ".wav"
-    subprocess.run(
-        ["ffmpeg", "-y", "-i", ogg_path, "-ar", "16000", "-ac", "1", wav_path],
-        capture_output=True, check=True,
-    )
-    return wav_path
+async def _prewarm_host(name: str, url: str) -> None:
+    try:
+        await _client.head(url, timeout=5.0)
+    except httpx.HTTPError as e:
+        log.info("%s pre-warm failed: %s", name, e)
+
+
+async def prewarm() -> None:
+    """Get providers ready ahead of the first voice message.
+
+    Opens connections to the configured API hosts and, when the local STT
+    model is the selected provider, starts loading it in the background.
+    """
+    global _local_warmup
+    hosts = []
+    if config.GROQ_API_KEY:
+        hosts.append(_prewarm_host("Groq", "https://api.groq.com/"))
+    if config.OPENAI_API_KEY:
+        hosts.append(_prewarm_host("OpenAI", "https://api.openai.com/"))
+    await asyncio.gather(*hosts)
+
+    if WhisperModel is not None and state.get_setting("stt_provider") == "local":
+        _local_warmup = asyncio.create_task(asyncio.to_thread(_get_local_model))
+        _local_warmup.add_done_callback(_log_warmup_failure)
+
+
+def _log_warmup_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        log.warning("Local Whisper warm-up failed: %s", task.exception())
+
+
+async def aclose() -> None:
+    """Close the shared HTTP client and persist caches (call on application shutdown)."""
+    await _client.aclose()
+    if _translate_cache.enabled:
+        await asyncio.to_thread(_translate_cache.flush)
+
+
+# --- Circuit breakers ---
+
+@dataclass
+class CircuitBreaker:
+    """Per-provider breaker: skip a provider while it is failing.
+
+    After ``threshold`` consecutive failures (or a 429 carrying Retry-After)
+    the breaker opens and calls are skipped until the cooldown ends. Then a
+    single half-open probe is let through; its outcome closes or reopens it.
+    """
+
+    threshold: int = 5
+    cooldown: float = 60.0
+    state: str = "closed"           # "closed", "open", "half_open"
+    failures: int = 0
+    opened_at: float = 0.0
+    open_for: float = 0.0
+    half_open_inflight: bool = False
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.open_for:
+                return False
+            self.state = "half_open"
+            self.half_open_inflight = False
+        if self.state == "half_open":
+            if self.half_open_inflight:
+                return False
+            self.half_open_inflight = True
+        return True
+
+    def remaining(self) -> float:
+        """Seconds until an open breaker lets a probe through (0 if not open)."""
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.open_for - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self.half_open_inflight = False
+
+    def record_failure(self, retry_after: float | None = None) -> None:
+        self.failures += 1
+        self.half_open_inflight = False
+        if retry_after or self.state == "half_open" or self.failures >= self.threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.open_for = retry_after or self.cooldown
+
+    def release(self) -> None:
+        """Forget an in-flight probe whose outcome is unknown (e.g. cancelled)."""
+        self.half_open_inflight = False
+
+
+_breakers: dict[str, CircuitBreaker] = {
+    "groq_stt": CircuitBreaker(),
+    "openai_stt": CircuitBreaker(),
+    "groq_llm": CircuitBreaker(),
+    "openai_llm": CircuitBreaker(),
+    "openai_tts": CircuitBreaker(),
+    "edge_tts": CircuitBreaker(),
+}
+
+
+# --- Adaptive timeouts ---
+
+class _LatencyStats:
+    """Rough EWMA estimates of a provider's median and tail latency.
+
+    The tail estimate rises quickly on slow responses and decays slowly,
+    so the derived timeout stays generous for providers with spiky latency.
+    """
+
+    MIN_SAMPLES = 5
+    MAX_READ = 30.0
+    MIN_READ = 3.0
+
+    def __init__(self, alpha: float = 0.1):
+        self.alpha = alpha
+        self.samples = 0
+        self.p50_ewma = 0.0
+        self.p99_ewma = 0.0
+
+    def record(self, elapsed: float) -> None:
+        if self.samples == 0:
+            self.p50_ewma = self.p99_ewma = elapsed
+        else:
+            self.p50_ewma += self.alpha * (elapsed - self.p50_ewma)
+            rate = self.alpha if elapsed > self.p99_ewma else self.alpha / 10
+            self.p99_ewma += rate * (elapsed - self.p99_ewma)
+        self.samples += 1
+
+    def read_timeout(self) -> float:
+        if self.samples < self.MIN_SAMPLES:
+            return self.MAX_READ
+        return min(self.MAX_READ, max(self.MIN_READ, 3 * self.p99_ewma))
+
+
+_stats: dict[str, _LatencyStats] = {
+    name: _LatencyStats()
+    for name in ("groq_stt", "openai_stt", "groq_llm", "openai_llm", "openai_tts")
+}
+
+
+def _retry_after(resp: httpx.Response) -> float | None:
+    """Parse a numeric Retry-After header (seconds)."""
+    try:
+        return float(resp.headers["retry-after"])
+    except (KeyError, ValueError):
+        return None
+
+
+async def _post(breaker: str, label: str, url: str, **kwargs) -> httpx.Response | None:
+    """POST through the shared client, guarded by the provider's circuit breaker.
+
+    The read timeout adapts to the provider's recent latency. Returns the
+    response on HTTP 200, otherwise logs and returns None. 429/5xx
+    responses, timeouts and transport errors count as breaker failures.
+    """
+    cb = _breakers[breaker]
+    if not cb.allow():
+        return None
+    stats = _stats[breaker]
+    read = stats.read_timeout()
+    started = time.monotonic()
+    try:
+        resp = await _client.post(url, timeout=httpx.Timeout(read, connect=2.0), **kwargs)
+    except asyncio.CancelledError:
+        cb.release()
+        raise
+    except httpx.TimeoutException as e:
+        # Count the timeout as a slow sample so the next timeout widens
+        stats.record(read)
+        cb.record_failure()
+        log.warning("%s timed out after %.1fs: %s", label, time.monotonic() - started, e)
+        return None
+    except Exception as e:
+        cb.record_failure()
+        log.warning("%s error: %s", label, e)
+        return None
+
+    if resp.status_code == 429 or resp.status_code >= 500:
+        cb.record_failure(_retry_after(resp) if resp.status_code == 429 else None)
+    else:
+        cb.record_success()
+    if resp.status_code == 200:
+        stats.record(time.monotonic() - started)
+        return resp
+    log.warning("%s failed: %d %s", label, resp.status_code, resp.text[:200])
+    return None
+
+
+# --- Hedged provider calls ---
+
+# Seconds to wait on a provider before also starting the next one
+_HEDGE_DELAY = 0.8
+# edge-tts routinely takes longer than _HEDGE_DELAY and the hedge (OpenAI) is billed
+_TTS_HEDGE_DELAY = 2.0
+
+
+async def _hedge(calls: list[tuple[str, Callable[[], Awaitable[Any]]]],
+                 delay: float, what: str) -> tuple[str | None, Any]:
+    """Run provider calls as a staggered hedge and return the first truthy result.
+
+    The first call starts immediately. Each following call starts when the
+    running ones have not answered within ``delay`` seconds, or right away
+    once they have all failed. Losing calls are cancelled. Returns
+    ``(provider_name, result)``, or ``(None, None)`` if every call failed.
+    """
+    queue = iter(calls)
+    running: dict[asyncio.Task, str] = {}
+
+    def launch_next() -> None:
+        nxt = next(queue, None)
+        if nxt is not None:
+            running[asyncio.create_task(nxt[1]())] = nxt[0]
+
+    launch_next()
+    winner: tuple[str, Any] | None = None
+    try:
+        while running:
+            done, _ = await asyncio.wait(
+                running, timeout=delay, return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                launch_next()
+                continue
+            for task in done:
+                name = running.pop(task)
+                result = None if task.exception() else task.result()
+                if result and winner is None:
+                    winner = (name, result)
+            if winner:
+                break
+            if not running:
+                launch_next()
+    finally:
+        for task in running:
+            task.cancel()
+
+    if winner is None:
+        return None, None
+    log.info("[hedge] %s served by %s", what, winner[0])
+    return winner
+
+
+class ProviderRouter:
+    """Orders the providers for a skill, skipping those whose breaker is cooling down.
+
+    Providers are registered in preference order (cheapest first). pick()
+    keeps that order but drops providers in cooldown, and logs the decision
+    whenever a provider was skipped.
+    """
+
+    def __init__(self):
+        self._routes: dict[str, list[tuple[str, str, Callable[..., Awaitable[Any]]]]] = {}
+
+    def register(self, skill: str, name: str, breaker: str,
+                 fn: Callable[..., Awaitable[Any]]) -> None:
+        self._routes.setdefault(skill, []).append((name, breaker, fn))
+
+    def pick(self, skill: str) -> list[tuple[str, Callable[..., Awaitable[Any]]]]:
+        healthy, cooling = [], []
+        for name, breaker, fn in self._routes.get(skill, []):
+            left = _breakers[breaker].remaining()
+            if left:
+                cooling.append(f"{name} in cooldown {left:.0f} s")
+            else:
+                healthy.append((name, fn))
+        if cooling:
+            log.info("[router] %s → %s (%s)", skill,
+                     healthy[0][0] if healthy else "none", ", ".join(cooling))
+        return healthy
+
+
+_router = ProviderRouter()
+
+
+# --- ffmpeg ---
+
+# ffmpeg prefix: keep stderr down to actual errors so it is cheap to capture
+_FFMPEG = ("ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error")
+
+
+def _ffmpeg_error(returncode: int, stderr: bytes) -> RuntimeError:
+    detail = stderr[:200].decode(errors="replace").strip()
+    log.warning("ffmpeg failed (exit %s): %s", returncode, detail)
+    return RuntimeError(f"ffmpeg exited with {returncode}")
 
 
 # --- STT: Speech-to-Text ---
 
-async def transcribe_groq(audio_path: str) -> str | None:
+_AUDIO_FILENAMES = {"audio/ogg": "audio.ogg", "audio/wav": "audio.wav"}
+
+
+def _audio_upload(audio: bytes, mime: str) -> dict:
+    return {"file": (_AUDIO_FILENAMES.get(mime, "audio.ogg"), audio, mime)}
+
+
+async def transcribe_groq(audio: bytes, mime: str = "audio/ogg") -> str | None:
     """Transcribe audio using Groq Whisper API. Returns text or None on failure."""
     if not config.GROQ_API_KEY:
         return None
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            with open(audio_path, "rb") as f:
-                resp = await client.post(
-                    "https://api.groq.com/openai/v1/audio/transcriptions",
-                    headers={"Authorization": f"Bearer {config.GROQ_API_KEY}"},
-                    files={"file": ("audio.wav", f, "audio/wav")},
-                    data={"model": "whisper-large-v3", "language": "he"},
-                )
-            if resp.status_code == 200:
-                return resp.json().get("text", "").strip()
-            log.warning("Groq STT failed: %d %s", resp.status_code, resp.text[:200])
+        resp = await _post(
+            "groq_stt", "Groq STT",
+            "https://api.groq.com/openai/v1/audio/transcriptions",
+            headers={"Authorization": f"Bearer {config.GROQ_API_KEY}"},
+            files=_audio_upload(audio, mime),
+            data={"model": "whisper-large-v3", "language": "he"},
+        )
+        if resp is not None:
+            return resp.json().get("text", "").strip()
     except Exception as e:
         log.warning("Groq STT error: %s", e)
     return None
 
 
-async def transcribe_openai(audio_path: str) -> str | None:
+async def transcribe_openai(audio: bytes, mime: str = "audio/ogg") -> str | None:
     """Transcribe audio using OpenAI Whisper API. Returns text or None on failure."""
     if not config.OPENAI_API_KEY:
         return None
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            with open(audio_path, "rb") as f:
-                resp = await client.post(
-                    "https://api.openai.com/v1/audio/transcriptions",
-                    headers={"Authorization": f"Bearer {config.OPENAI_API_KEY}"},
-                    files={"file": ("audio.wav", f, "audio/wav")},
-                    data={"model": "whisper-1"},
-                )
-            if resp.status_code == 200:
-                return resp.json().get("text", "").strip()
-            log.warning("OpenAI STT failed: %d %s", resp.status_code, resp.text[:200])
+        resp = await _post(
+            "openai_stt", "OpenAI STT",
+            "https://api.openai.com/v1/audio/transcriptions",
+            headers={"Authorization": f"Bearer {config.OPENAI_API_KEY}"},
+            files=_audio_upload(audio, mime),
+            data={"model": "whisper-1"},
+        )
+        if resp is not None:
+            return resp.json().get("text", "").strip()
     except Exception as e:
         log.warning("OpenAI STT error: %s", e)
     return None
 
 
-async def transcribe(audio_path: str) -> str:
-    """Transcribe audio using configured provider(s). Returns transcribed text."""
-    settings = state.load_settings()
-    provider = settings.get("stt_provider", "auto")
+_local_model = None
+_local_model_lock = threading.Lock()
+_local_warmup: asyncio.Task | None = None
 
-    if provider == "groq":
-        result = await transcribe_groq(audio_path)
-        if result:
-            return result
-        return "[Transcription failed - Groq unavailable]"
 
-    if provider == "openai":
-        result = await transcribe_openai(audio_path)
-        if result:
-            return result
-        return "[Transcription failed - OpenAI unavailable]"
+def _get_local_model():
+    global _local_model
+    with _local_model_lock:
+        if _local_model is None:
+            _local_model = WhisperModel(
+                config.WHISPER_MODEL, device="cpu", compute_type="int8",
+                # Lets concurrent to_thread callers transcribe in parallel
+                num_workers=2,
+            )
+        return _local_model
+
+
+def _transcribe_local_sync(audio: bytes) -> str:
+    # Greedy decoding: voice memos are short and beam search mostly adds latency
+    segments, _ = _get_local_model().transcribe(
+        io.BytesIO(audio), language="he", beam_size=1,
+    )
+    return " ".join(seg.text.strip() for seg in segments).strip()
+
+
+async def transcribe_local(audio: bytes, mime: str = "audio/ogg") -> str | None:
+    """Transcribe on this machine with faster-whisper. Returns text or None.
+
+    Uses the config.WHISPER_MODEL size (default "small") with int8 on CPU.
+    Slower than the hosted models, but works with no network. The model is
+    loaded on first use.
+    """
+    if WhisperModel is None:
+        return None
+    try:
+        return await asyncio.to_thread(_transcribe_local_sync, audio) or None
+    except Exception as e:
+        log.warning("Local STT error: %s", e)
+    return None
+
+
+_router.register("stt", "groq", "groq_stt", transcribe_groq)
+_router.register("stt", "openai", "openai_stt", transcribe_openai)
+
+
+# Transcripts are cached by audio hash: Telegram retries and forwards
+# deliver byte-identical voice notes. Entries (in memory and on disk) are
+# LRU-bounded and expire after a day so transcripts are not kept forever.
+_STT_CACHE_DIR = config.STATE_DIR / "stt_cache"
+_STT_CACHE_SIZE = 512
+_STT_CACHE_TTL = 24 * 3600
+_stt_cache: OrderedDict[str, tuple[float, str]] = OrderedDict()
+_stt_inflight: dict[str, asyncio.Task] = {}
 
-    # Auto mode: try Groq first, fallback to OpenAI
-    result = await transcribe_groq(audio_path)
+_STT_FAILURES = {
+    "groq": "Groq unavailable",
+    "openai": "OpenAI unavailable",
+    "local": "local model unavailable",
+}
+
+
+def _stt_cache_key(audio: bytes) -> str:
+    return hashlib.blake2b(audio, digest_size=16).hexdigest()
+
+
+def _stt_cache_remember(key: str, created: float, text: str) -> None:
+    _stt_cache[key] = (created, text)
+    _stt_cache.move_to_end(key)
+    while len(_stt_cache) > _STT_CACHE_SIZE:
+        _stt_cache.popitem(last=False)
+
+
+def _stt_cache_get(key: str) -> str | None:
+    entry = _stt_cache.get(key)
+    if entry is None:
+        return None
+    if time.time() - entry[0] > _STT_CACHE_TTL:
+        del _stt_cache[key]
+        return None
+    _stt_cache.move_to_end(key)
+    return entry[1]
+
+
+def _stt_cache_read(key: str) -> tuple[float, str] | None:
+    """Load a transcript from disk; expired files are deleted and treated as misses."""
+    path = _STT_CACHE_DIR / f"{key}.txt"
+    try:
+        created = path.stat().st_mtime
+        if time.time() - created > _STT_CACHE_TTL:
+            path.unlink(missing_ok=True)
+            return None
+        return created, path.read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+
+def _stt_cache_write(key: str, text: str) -> None:
+    """Atomically store a transcript, then drop expired and least recent files."""
+    _STT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    dst = _STT_CACHE_DIR / f"{key}.txt"
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, dst)
+
+    cutoff = time.time() - _STT_CACHE_TTL
+    entries = []
+    for entry in os.scandir(_STT_CACHE_DIR):
+        if not entry.name.endswith(".txt"):
+            continue
+        mtime = entry.stat().st_mtime
+        if mtime < cutoff:
+            Path(entry.path).unlink(missing_ok=True)
+        else:
+            entries.append((mtime, entry.path))
+    entries.sort()
+    for _, path in entries[:max(0, len(entries) - _STT_CACHE_SIZE)]:
+        if path != str(dst):
+            Path(path).unlink(missing_ok=True)
+
+
+async def _transcribe_with(provider: str, audio: bytes, mime: str) -> str | None:
+    if provider == "groq":
+        return await transcribe_groq(audio, mime)
+    if provider == "openai":
+        return await transcribe_openai(audio, mime)
+    if provider == "local":
+        return await transcribe_local(audio, mime)
+
+    # Auto mode: cheapest healthy provider first, hedged with the next one
+    _, result = await _hedge([
+        (name, lambda fn=fn: fn(audio, mime)) for name, fn in _router.pick("stt")
+    ], _HEDGE_DELAY, "STT")
     if result:
         return result
-    log.info("Groq STT failed, falling back to OpenAI")
-    result = await transcribe_openai(audio_path)
+    # Every hosted provider failed or is cooling down: transcribe locally
+    result = await transcribe_local(audio, mime)
     if result:
-        return result
-    return "[Transcription failed - all providers unavailable]"
+        log.info("[router] stt → local (hosted providers unavailable)")
+    return result
+
+
+async def _transcribe_uncached(key: str, audio: bytes, mime: str) -> str:
+    provider = state.get_setting("stt_provider")
+
+    result = await _transcribe_with(provider, audio, mime)
+    if not result:
+        reason = _STT_FAILURES.get(provider, "all providers unavailable")
+        return f"[Transcription failed - {reason}]"
+    _stt_cache_remember(key, time.time(), result)
+    try:
+        await asyncio.to_thread(_stt_cache_write, key, result)
+    except OSError as e:
+        log.warning("STT cache write failed: %s", e)
+    return result
+
+
+async def transcribe(audio: bytes, mime: str = "audio/ogg") -> str:
+    """Transcribe audio bytes using configured provider(s). Returns transcribed text.
+
+    Telegram voice notes (Opus in Ogg) are uploaded as-is; both Whisper
+    endpoints accept them, so no WAV conversion is needed.
+    """
+    key = _stt_cache_key(audio)
+    cached = _stt_cache_get(key)
+    if cached is not None:
+        return cached
+    stored = await asyncio.to_thread(_stt_cache_read, key)
+    if stored is not None:
+        _stt_cache_remember(key, *stored)
+        return stored[1]
+
+    # Identical notes arriving together (forwards, retries) share one request
+    task = _stt_inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_transcribe_uncached(key, audio, mime))
+        _stt_inflight[key] = task
+        task.add_done_callback(lambda _: _stt_inflight.pop(key, None))
+    return await asyncio.shield(task)
 
 
 # --- Translation: Hebrew → English ---
@@ -111,26 +576,25 @@ async def _translate_groq(hebrew_text: str) -> str | None:
     if not config.GROQ_API_KEY:
         return None
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {config.GROQ_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "llama-3.3-70b-versatile",
-                    "messages": [
-                        {"role": "system", "content": _TRANSLATE_PROMPT},
-                        {"role": "user", "content": hebrew_text},
-                    ],
-                    "temperature": 0.1,
-                    "max_tokens": 4096,
-                },
-            )
-            if resp.status_code == 200:
-                return resp.json()["choices"][0]["message"]["content"].strip()
-            log.warning("Groq translate failed: %d %s", resp.status_code, resp.text[:200])
+        resp = await _post(
+            "groq_llm", "Groq translate",
+            "https://api.groq.com/openai/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {config.GROQ_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": "llama-3.3-70b-versatile",
+                "messages": [
+                    {"role": "system", "content": _TRANSLATE_PROMPT},
+                    {"role": "user", "content": hebrew_text},
+                ],
+                "temperature": 0.1,
+                "max_tokens": 4096,
+            },
+        )
+        if resp is not None:
+            return resp.json()["choices"][0]["message"]["content"].strip()
     except Exception as e:
         log.warning("Groq translate error: %s", e)
     return None
@@ -141,105 +605,347 @@ async def _translate_openai(hebrew_text: str) -> str | None:
     if not config.OPENAI_API_KEY:
         return None
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {config.OPENAI_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [
-                        {"role": "system", "content": _TRANSLATE_PROMPT},
-                        {"role": "user", "content": hebrew_text},
-                    ],
-                    "temperature": 0.1,
-                    "max_tokens": 4096,
-                },
-            )
-            if resp.status_code == 200:
-                return resp.json()["choices"][0]["message"]["content"].strip()
-            log.warning("OpenAI translate failed: %d %s", resp.status_code, resp.text[:200])
+        resp = await _post(
+            "openai_llm", "OpenAI translate",
+            "https://api.openai.com/v1/chat/completions",
+            headers={
+                "Authorization": f"Bearer {config.OPENAI_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": "gpt-4o-mini",
+                "messages": [
+                    {"role": "system", "content": _TRANSLATE_PROMPT},
+                    {"role": "user", "content": hebrew_text},
+                ],
+                "temperature": 0.1,
+                "max_tokens": 4096,
+            },
+        )
+        if resp is not None:
+            return resp.json()["choices"][0]["message"]["content"].strip()
     except Exception as e:
         log.warning("OpenAI translate error: %s", e)
     return None
 
 
-async def translate_to_english(hebrew_text: str) -> str:
-    """Translate Hebrew text to English. Uses Groq LLM (free) with OpenAI fallback."""
-    result = await _translate_groq(hebrew_text)
-    if result:
-        return result
-    log.info("Groq translation failed, falling back to OpenAI")
-    result = await _translate_openai(hebrew_text)
+_router.register("translate", "groq", "groq_llm", _translate_groq)
+_router.register("translate", "openai", "openai_llm", _translate_openai)
+
+
+# Hebrew negations: differences change meaning even when embeddings barely move
+_NEGATIONS = frozenset({
+    "לא", "אל", "אין", "בלי", "ללא", "מבלי", "אינו", "אינה", "אינם", "אסור",
+})
+_WORD_RE = re.compile(r"[\w']+")
+
+
+def _guard_tokens(text: str) -> frozenset[str]:
+    """Numbers, Latin-script words (names, frameworks) and negations in ``text``.
+
+    Two inputs are only treated as the same phrase if these match exactly.
+    Hebrew one-letter prefixes are stripped before the negation check
+    (e.g. "שלא", "ולא").
+    """
+    out = set()
+    for tok in _WORD_RE.findall(text.lower()):
+        if tok.isascii():  # digits and Latin-script words
+            out.add(tok)
+        elif tok in _NEGATIONS or (len(tok) > 2 and tok[1:] in _NEGATIONS):
+            out.add("¬")
+    return frozenset(out)
+
+
+class _SemanticCache:
+    """Nearest-neighbour cache of Hebrew -> English translations.
+
+    Short Hebrew inputs are embedded with a small local multilingual model;
+    a cached translation is reused when the cosine similarity to a stored
+    input is at least ``min_sim`` and both inputs have the same numbers,
+    Latin-script words and negations (see _guard_tokens). Embeddings are
+    kept as one (N, d) float16 matrix so a lookup is a single matrix-vector
+    product. Least recently used rows are overwritten once ``max_entries``
+    is reached. Persisted to an .npz file every ``save_every`` inserts and
+    on flush(). Opt-in: disabled unless numpy and fastembed are installed.
+    """
+
+    MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+    def __init__(self, path: Path, min_sim: float = 0.97,
+                 max_entries: int = 2048, max_chars: int = 200,
+                 save_every: int = 32):
+        self.path = path
+        self.min_sim = min_sim
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.save_every = save_every
+        self._unsaved = 0
+        self.enabled = TextEmbedding is not None
+        self._lock = threading.Lock()
+        self._model = None
+        self._loaded = False
+        self._emb = None          # (N, d) float16, rows L2-normalised
+        self._hebrew: list[str] = []
+        self._english: list[str] = []
+        self._used: list[float] = []
+
+    def applies(self, text: str) -> bool:
+        return self.enabled and len(text) <= self.max_chars
+
+    def _load(self) -> None:
+        self._loaded = True
+        if not self.path.exists():
+            return
+        with np.load(self.path) as z:
+            self._emb = z["emb"]
+            self._hebrew = z["hebrew"].tolist()
+            self._english = z["english"].tolist()
+            self._used = z["used"].tolist()
+
+    def _save(self) -> None:
+        tmp = self.path.with_name(self.path.name + ".tmp.npz")
+        np.savez(tmp, emb=self._emb, hebrew=np.array(self._hebrew),
+                 english=np.array(self._english), used=np.array(self._used))
+        os.replace(tmp, self.path)
+        self._unsaved = 0
+
+    def _embed(self, text: str):
+        if self._model is None:
+            self._model = TextEmbedding(self.MODEL)
+        vec = np.asarray(next(iter(self._model.embed([text]))), dtype=np.float32)
+        return vec / (np.linalg.norm(vec) or 1.0)
+
+    def lookup(self, text: str):
+        """Return (cached English or None, embedding of ``text``). Blocking."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            vec = self._embed(text)
+            if self._emb is None or not len(self._emb):
+                return None, vec
+            sims = self._emb.astype(np.float32) @ vec
+            guard = None
+            for i in np.argsort(sims)[::-1]:
+                if sims[i] < self.min_sim:
+                    break
+                if guard is None:
+                    guard = _guard_tokens(text)
+                if _guard_tokens(self._hebrew[i]) == guard:
+                    self._used[i] = time.time()
+                    return self._english[i], vec
+            return None, vec
+
+    def insert(self, text: str, english: str, vec) -> None:
+        """Store a translation using the embedding from lookup(). Blocking."""
+        row = vec.astype(np.float16)[None, :]
+        with self._lock:
+            if self._emb is None:
+                self._emb = row
+                self._hebrew, self._english, self._used = [text], [english], [time.time()]
+            elif len(self._hebrew) < self.max_entries:
+                self._emb = np.vstack([self._emb, row])
+                self._hebrew.append(text)
+                self._english.append(english)
+                self._used.append(time.time())
+            else:
+                i = int(np.argmin(self._used))
+                self._emb[i] = row[0]
+                self._hebrew[i], self._english[i], self._used[i] = text, english, time.time()
+            self._unsaved += 1
+            if self._unsaved >= self.save_every:
+                self._save()
+
+    def flush(self) -> None:
+        """Persist inserts not yet written to disk. Blocking."""
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+
+_translate_cache = _SemanticCache(config.STATE_DIR / "translate_cache.npz")
+
+
+async def translate_to_english(hebrew_text: str, use_cache: bool = True) -> str:
+    """Translate Hebrew text to English. Uses Groq LLM (free) with OpenAI fallback.
+
+    Short inputs are served from the semantic cache when a near-identical
+    phrase was translated before; pass ``use_cache=False`` to force a fresh
+    translation (e.g. when the user asks to re-translate).
+    """
+    vec = None
+    if use_cache and _translate_cache.applies(hebrew_text):
+        try:
+            hit, vec = await asyncio.to_thread(_translate_cache.lookup, hebrew_text)
+            if hit:
+                return hit
+        except Exception as e:
+            log.warning("Translation cache disabled: %s", e)
+            _translate_cache.enabled = False
+
+    _, result = await _hedge([
+        (name, lambda fn=fn: fn(hebrew_text)) for name, fn in _router.pick("translate")
+    ], _HEDGE_DELAY, "translate")
     if result:
+        if vec is not None:
+            try:
+                await asyncio.to_thread(_translate_cache.insert, hebrew_text, result, vec)
+            except Exception as e:
+                log.warning("Translation cache write failed: %s", e)
         return result
     return "[Translation failed - all providers unavailable]"
 
 
 # --- TTS: Text-to-Speech ---
 
-async def tts_edge(text: str, voice: str | None = None) -> str | None:
-    """Generate speech using edge-tts (Microsoft, free). Returns ogg path or None."""
-    settings = state.load_settings()
-    voice = voice or settings.get("tts_voice", "en-US-AriaNeural")
+async def tts_edge(text: str, voice: str | None = None) -> bytes | None:
+    """Generate speech using edge-tts (Microsoft, free). Returns ogg bytes or None."""
+    voice = voice or state.get_setting("tts_voice")
 
+    cb = _breakers["edge_tts"]
+    if not cb.allow():
+        return None
+    proc = None
     try:
-        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as tmp:
-            mp3_path = tmp.name
-
-        communicate = edge_tts.Communicate(text, voice)
-        await communicate.save(mp3_path)
-
-        # Convert mp3 to ogg for Telegram voice message
-        ogg_path = mp3_path.rsplit(".", 1)[0] + ".ogg"
-        subprocess.run(
-            ["ffmpeg", "-y", "-i", mp3_path, "-c:a", "libopus", ogg_path],
-            capture_output=True, check=True,
+        # Start ffmpeg first and feed it mp3 chunks as edge-tts produces them,
+        # so Opus encoding overlaps with synthesis instead of following it.
+        # edge-tts only emits mp3, so a stream copy is not possible; encode
+        # mono speech at the native 24 kHz to keep the Opus pass cheap.
+        proc = await asyncio.create_subprocess_exec(
+            *_FFMPEG, "-f", "mp3", "-i", "pipe:0",
+            "-c:a", "libopus", "-application", "voip", "-b:a", "32k", "-ac", "1",
+            "-f", "ogg", "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
         )
-        Path(mp3_path).unlink(missing_ok=True)
-        return ogg_path
+        reader = asyncio.create_task(proc.stdout.read())
+        errors = asyncio.create_task(proc.stderr.read())
+        try:
+            communicate = edge_tts.Communicate(text, voice)
+            async for chunk in communicate.stream():
+                if chunk["type"] == "audio":
+                    proc.stdin.write(chunk["data"])
+                    await proc.stdin.drain()
+            proc.stdin.close()
+            ogg = await reader
+            err = await errors
+        finally:
+            reader.cancel()
+            errors.cancel()
+        await proc.wait()
+        if proc.returncode != 0 or not ogg:
+            raise _ffmpeg_error(proc.returncode, err)
+
+        cb.record_success()
+        return ogg
+    except asyncio.CancelledError:
+        cb.release()
+        raise
     except Exception as e:
+        cb.record_failure()
         log.warning("edge-tts error: %s", e)
         return None
+    finally:
+        if proc is not None and proc.returncode is None:
+            proc.kill()
+
 
+_OPENAI_TTS_VOICE = "nova"
 
-async def tts_openai(text: str) -> str | None:
-    """Generate speech using OpenAI TTS. Returns ogg path or None."""
+
+async def tts_openai(text: str) -> bytes | None:
+    """Generate speech using OpenAI TTS. Returns ogg bytes or None."""
     if not config.OPENAI_API_KEY:
         return None
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            resp = await client.post(
-                "https://api.openai.com/v1/audio/speech",
-                headers={
-                    "Authorization": f"Bearer {config.OPENAI_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={"model": "tts-1", "input": text, "voice": "nova", "response_format": "opus"},
-            )
-            if resp.status_code == 200:
-                with tempfile.NamedTemporaryFile(suffix=".ogg", delete=False) as tmp:
-                    tmp.write(resp.content)
-                    return tmp.name
-            log.warning("OpenAI TTS failed: %d", resp.status_code)
+        resp = await _post(
+            "openai_tts", "OpenAI TTS",
+            "https://api.openai.com/v1/audio/speech",
+            headers={
+                "Authorization": f"Bearer {config.OPENAI_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": "tts-1", "input": text,
+                "voice": _OPENAI_TTS_VOICE, "response_format": "opus",
+            },
+        )
+        if resp is not None:
+            return resp.content
     except Exception as e:
         log.warning("OpenAI TTS error: %s", e)
     return None
 
 
+# Generated speech is cached on disk keyed by (provider, voice, text)
+_TTS_CACHE_DIR = config.STATE_DIR / "tts_cache"
+_TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+
+def _tts_cache_path(provider: str, voice: str, text: str) -> Path:
+    key = hashlib.sha256(f"{provider}|{voice}|{text}".encode()).hexdigest()[:32]
+    return _TTS_CACHE_DIR / f"{key}.ogg"
+
+
+def _tts_cache_store(ogg: bytes, dst: Path) -> str:
+    """Atomically write generated ogg audio into the cache, then evict LRU entries."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(ogg)
+    os.replace(tmp, dst)
+
+    entries = []
+    total = 0
+    for entry in os.scandir(dst.parent):
+        if entry.name.endswith(".ogg"):
+            st = entry.stat()
+            entries.append((st.st_mtime, st.st_size, entry.path))
+            total += st.st_size
+    for _, size, path in sorted(entries):
+        if total <= _TTS_CACHE_MAX_BYTES:
+            break
+        if path != str(dst):
+            Path(path).unlink(missing_ok=True)
+            total -= size
+    return str(dst)
+
+
+def _tts_cache_touch(path: Path) -> bool:
+    """Mark a cached ogg as recently used. Returns False if it isn't cached."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
 async def text_to_speech(text: str) -> str | None:
-    """Convert text to speech using configured provider. Returns ogg path or None."""
-    settings = state.load_settings()
-    provider = settings.get("tts_provider", "edge")
+    """Convert text to speech using configured provider. Returns ogg path or None.
 
-    if provider == "openai":
-        return await tts_openai(text)
+    The returned file lives in the TTS cache; callers must not delete it.
+    """
+    provider = state.get_setting("tts_provider")
+    edge_voice = state.get_setting("tts_voice")
+    # Cache keys use the voice that is actually synthesised by each provider
+    voices = {"edge": edge_voice, "openai": _OPENAI_TTS_VOICE}
+    if provider != "openai":
+        provider = "edge"
 
-    # Default: edge-tts (free)
-    result = await tts_edge(text)
-    if result:
-        return result
-    # Fallback to OpenAI if edge-tts fails
-    return await tts_openai(text)
+    cached = _tts_cache_path(provider, voices[provider], text)
+    if await asyncio.to_thread(_tts_cache_touch, cached):
+        return str(cached)
+
+    if provider == "openai":
+        result = await tts_openai(text)
+    else:
+        # Default: edge-tts (free), hedged with OpenAI if edge is slow or fails
+        provider, result = await _hedge([
+            ("edge", lambda: tts_edge(text, edge_voice)),
+            ("openai", lambda: tts_openai(text)),
+        ], _TTS_HEDGE_DELAY, "TTS")
+
+    if not result:
+        return None
+    # A hedge won by OpenAI is stored under OpenAI's key, not the edge voice's
+    dst = _tts_cache_path(provider, voices[provider], text)
+    return await asyncio.to_thread(_tts_cache_store, result, dst)